@@ -0,0 +1,208 @@
+# engine/archive_store.py
+
+import gzip
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+
+try:
+    import zstandard
+except ImportError:  # optional; gzip is always available
+    zstandard = None
+
+OBJECTS_DIR = "objects"
+MANIFEST_NAME = "manifest.json"
+RUN_DAY_FORMAT = "%Y-%m-%d"
+
+
+class ArchiveStore:
+    """
+    Content-addressed, compressed store for archived input files.
+
+    Each file is stored once under objects/<sha[:2]>/<sha256>.<ext>; a run's
+    archive folder (<day>/<run>/) holds only a manifest.json that
+    references the objects, so repeated Sitetracker snapshots cost nothing.
+    """
+
+    def __init__(self, root: str, compression: str = "gzip"):
+        if compression == "zstd" and zstandard is None:
+            print("[WARN] zstandard is not installed; archiving with gzip")
+            compression = "gzip"
+        if compression not in ("gzip", "zstd", "none"):
+            raise Exception(f"Unknown archive compression: {compression}")
+
+        self.root = root
+        self.compression = compression
+
+    def _object_path(self, sha256, compression):
+        ext = {"gzip": ".gz", "zstd": ".zst", "none": ""}[compression]
+        return os.path.join(self.root, OBJECTS_DIR, sha256[:2], sha256 + ext)
+
+    def _find_object(self, sha256):
+        for compression in ("zstd", "gzip", "none"):
+            path = self._object_path(sha256, compression)
+            if os.path.exists(path):
+                return path, compression
+        return None, None
+
+    def _write_object(self, src, sha256):
+        dst = self._object_path(sha256, self.compression)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp = dst + ".tmp"
+
+        with open(src, "rb") as fin:
+            if self.compression == "gzip":
+                with gzip.open(tmp, "wb", compresslevel=6) as fout:
+                    shutil.copyfileobj(fin, fout, 1024 * 1024)
+            elif self.compression == "zstd":
+                with open(tmp, "wb") as raw:
+                    with zstandard.ZstdCompressor(level=10).stream_writer(raw) as fout:
+                        shutil.copyfileobj(fin, fout, 1024 * 1024)
+            else:
+                with open(tmp, "wb") as fout:
+                    shutil.copyfileobj(fin, fout, 1024 * 1024)
+
+        os.replace(tmp, dst)
+        return dst, self.compression
+
+    def store_run(self, run_day, run_time, files):
+        """
+        Archive and remove the given input files.
+        files: [(role, path, sha256)]. Returns the manifest path.
+        """
+        run_archive = os.path.join(self.root, run_day, run_time)
+        os.makedirs(run_archive, exist_ok=True)
+
+        entries = []
+        for role, path, sha256 in files:
+            obj, compression = self._find_object(sha256)
+            reused = obj is not None
+            if not reused:
+                obj, compression = self._write_object(path, sha256)
+
+            entries.append({
+                "role": role,
+                "file_name": os.path.basename(path),
+                "sha256": sha256,
+                "size_bytes": os.path.getsize(path),
+                "object": os.path.relpath(obj, self.root),
+                "compression": compression,
+                "deduplicated": reused
+            })
+
+        manifest = os.path.join(run_archive, MANIFEST_NAME)
+        with open(manifest, "w", encoding="utf-8") as f:
+            json.dump({"run_day": run_day, "run_time": run_time, "files": entries}, f, indent=2)
+
+        # Only remove the inputs once the manifest is safely written
+        for _, path, _ in files:
+            os.remove(path)
+
+        return manifest
+
+    def restore(self, manifest_path, dest_dir):
+        """
+        Decompress a run's archived inputs into dest_dir under their
+        original names. Returns the restored paths.
+        """
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        os.makedirs(dest_dir, exist_ok=True)
+        restored = []
+        for entry in manifest["files"]:
+            src = os.path.join(self.root, entry["object"])
+            dst = os.path.join(dest_dir, entry["file_name"])
+
+            with open(dst, "wb") as fout:
+                if entry["compression"] == "gzip":
+                    with gzip.open(src, "rb") as fin:
+                        shutil.copyfileobj(fin, fout, 1024 * 1024)
+                elif entry["compression"] == "zstd":
+                    if zstandard is None:
+                        raise Exception("zstandard is required to restore this archive")
+                    with open(src, "rb") as raw:
+                        with zstandard.ZstdDecompressor().stream_reader(raw) as fin:
+                            shutil.copyfileobj(fin, fout, 1024 * 1024)
+                else:
+                    with open(src, "rb") as fin:
+                        shutil.copyfileobj(fin, fout, 1024 * 1024)
+
+            restored.append(dst)
+        return restored
+
+    def _referenced_objects(self):
+        referenced = set()
+        for day, run in _run_folders(self.root):
+            manifest = os.path.join(self.root, day, run, MANIFEST_NAME)
+            if os.path.exists(manifest):
+                with open(manifest, "r", encoding="utf-8") as f:
+                    referenced.update(e["object"] for e in json.load(f)["files"])
+        return referenced
+
+    def collect_garbage(self):
+        """
+        Delete objects no manifest refers to. Returns the number removed.
+        """
+        referenced = self._referenced_objects()
+        objects_dir = os.path.join(self.root, OBJECTS_DIR)
+        removed = 0
+
+        if not os.path.isdir(objects_dir):
+            return removed
+
+        for prefix in os.listdir(objects_dir):
+            for name in os.listdir(os.path.join(objects_dir, prefix)):
+                rel = os.path.join(OBJECTS_DIR, prefix, name)
+                if rel not in referenced:
+                    os.remove(os.path.join(self.root, rel))
+                    removed += 1
+        return removed
+
+
+def _run_folders(base):
+    """
+    (day, run) folder pairs under base, oldest first.
+    """
+    if not os.path.isdir(base):
+        return []
+
+    folders = []
+    for day in os.listdir(base):
+        try:
+            datetime.strptime(day, RUN_DAY_FORMAT)
+        except ValueError:
+            continue
+        day_dir = os.path.join(base, day)
+        if os.path.isdir(day_dir):
+            folders.extend((day, run) for run in os.listdir(day_dir) if run.startswith("run_"))
+    return sorted(folders)
+
+
+def prune_runs(base, max_age_days=None, max_runs=None, today=None):
+    """
+    Delete <day>/<run> folders under base that are older than max_age_days
+    or beyond the newest max_runs. Returns the removed (day, run) pairs.
+    """
+    folders = _run_folders(base)
+    today = today or datetime.now().date()
+    doomed = set()
+
+    if max_age_days is not None:
+        cutoff = today - timedelta(days=max_age_days)
+        doomed.update(
+            f for f in folders
+            if datetime.strptime(f[0], RUN_DAY_FORMAT).date() < cutoff
+        )
+
+    if max_runs is not None and len(folders) > max_runs:
+        doomed.update(folders[:len(folders) - max_runs])
+
+    for day, run in sorted(doomed):
+        shutil.rmtree(os.path.join(base, day, run), ignore_errors=True)
+        day_dir = os.path.join(base, day)
+        if os.path.isdir(day_dir) and not os.listdir(day_dir):
+            os.rmdir(day_dir)
+
+    return sorted(doomed)
@@ -0,0 +1,119 @@
+# engine/change_log.py
+
+import os
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from engine.differ import CHANGE_COLUMNS
+
+CHANGE_LOG_DIR_NAME = "change_log"
+
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("report", pa.string()), ("run_date", pa.string())]),
+    flavor="hive"
+)
+
+SCHEMA = pa.schema(
+    [(c, pa.string()) for c in CHANGE_COLUMNS] + [
+        ("run_time", pa.string()),
+        ("changed_at", pa.timestamp("s")),
+        ("report", pa.string()),
+        ("run_date", pa.string()),
+    ]
+)
+
+
+class ChangeLogStore:
+    """
+    Parquet dataset of field-level changes across all runs,
+    partitioned as report=<name>/run_date=<YYYY-MM-DD>/<run_time>-0.parquet
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @staticmethod
+    def default_path(base_dir=None):
+        return os.path.join(base_dir or os.getcwd(), CHANGE_LOG_DIR_NAME)
+
+    def append(self, report_name, run_day, run_time, changes_df):
+        if changes_df.empty:
+            return
+
+        df = changes_df.reindex(columns=CHANGE_COLUMNS).astype("string")
+        # Sorted keys give tight row-group min/max stats for key lookups
+        df = df.sort_values(["Project Reference", "API Field"], kind="stable")
+        df["run_time"] = run_time
+        df["changed_at"] = datetime.strptime(
+            f"{run_day} {run_time}", "%Y-%m-%d run_%H-%M-%S"
+        )
+        df["report"] = report_name
+        df["run_date"] = run_day
+
+        table = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+
+        ds.write_dataset(
+            table,
+            self.root,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=f"{run_time}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore"
+        )
+
+    def _dataset(self):
+        return ds.dataset(
+            self.root, format="parquet", partitioning=PARTITIONING, schema=SCHEMA
+        )
+
+    def query(self, report_name=None, project_ref=None, api_field=None,
+              since=None, until=None, columns=None):
+        """
+        Filtered read of the change history. report_name and the run_date
+        range (since inclusive, until exclusive, YYYY-MM-DD) prune partitions;
+        project_ref and api_field (single value or list) are pushed down to
+        the Parquet row groups.
+        """
+        if not os.path.isdir(self.root):
+            return pd.DataFrame(columns=columns or SCHEMA.names)
+
+        filters = []
+        if report_name:
+            filters.append(ds.field("report") == report_name)
+        if since:
+            filters.append(ds.field("run_date") >= str(since))
+        if until:
+            filters.append(ds.field("run_date") < str(until))
+        if project_ref is not None:
+            filters.append(self._match("Project Reference", project_ref))
+        if api_field is not None:
+            filters.append(self._match("API Field", api_field))
+
+        expr = None
+        for f in filters:
+            expr = f if expr is None else expr & f
+
+        table = self._dataset().to_table(columns=columns, filter=expr)
+        df = table.to_pandas()
+        if "changed_at" in df.columns:
+            df = df.sort_values("changed_at", kind="stable").reset_index(drop=True)
+        return df
+
+    @staticmethod
+    def _match(column, value):
+        if isinstance(value, (list, tuple, set)):
+            return ds.field(column).isin(list(value))
+        return ds.field(column) == value
+
+    def last_change(self, report_name, project_ref, api_field):
+        """
+        Most recent change of one field for one record, or None.
+        """
+        df = self.query(report_name, project_ref=project_ref, api_field=api_field)
+        if df.empty:
+            return None
+        return df.iloc[-1].to_dict()
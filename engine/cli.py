@@ -1,17 +1,96 @@
+import argparse
+import json
 import sys
-from engine.input_file_engine import InputFileEngine
+from engine.input_file_engine import InputFileEngine, SkipRun
+from engine.memory_guard import MemoryBudgetExceeded, parse_size
+from engine.progress import ProgressReporter, json_lines, progress_bar
+from engine.watcher import DEFAULT_POLL_INTERVAL, watch
 
 def main():
-    if len(sys.argv) < 3 or sys.argv[1] != "--report": #If the arguments are not passed correctly it will stop the code [engine, --report, <REPORT_NAME>]
-        print("Usage: python -m engine.cli --report <REPORT_NAME>") #Example of failure Entered command without report name
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        prog="python -m engine.cli",
+        description="Generate the Salesforce input file for a report"
+    )
+    parser.add_argument(
+        "--report", action="append",
+        help='Report name, e.g. "Apollo 10G" (with --watch: repeatable, default all reports)'
+    )
+    parser.add_argument(
+        "--preview", action="store_true",
+        help="Estimate the delta from a sample of source rows; writes nothing"
+    )
+    parser.add_argument("--sample-rows", type=int, default=500, help="Rows to sample in preview mode")
+    parser.add_argument(
+        "--sample-method", choices=["head", "reservoir"], default="head",
+        help="head: first N rows (fastest), reservoir: uniform random sample"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Process the inputs even if an earlier run saw identical inputs"
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="Keep running; start a report's run whenever both of its inputs land"
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+        help="Seconds between folder scans when inotify is unavailable"
+    )
+    parser.add_argument(
+        "--shards", type=int,
+        help="Diff in N key-partitioned shards across worker processes (overrides diff.shards)"
+    )
+    parser.add_argument(
+        "--progress", choices=["bar", "json", "none"],
+        help="bar: progress bar on stderr (default on a terminal), "
+             "json: PROGRESS {json} lines on stdout, none: no progress output"
+    )
+    parser.add_argument(
+        "--memory-budget",
+        help='Memory limit for the run, e.g. "2GB" (overrides memory_budget)'
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Profile the run; writes profile.pstats, profile.collapsed (flame graph) "
+             "and profile_hotspots.txt to the run folder (overrides profile.enabled)"
+    )
+    args = parser.parse_args()
 
-    report_name = sys.argv[2]
-    engine = InputFileEngine(report_name) #calling the constructor - Initlializing the class with report name
-    engine.run() #running the main fun.
+    if args.watch:
+        watch(args.report, poll_interval=args.poll_interval)
+        return
+
+    if not args.report or len(args.report) != 1:
+        parser.error("exactly one --report is required")
+
+    progress = args.progress or ("bar" if sys.stderr.isatty() else "none")
+    callback = {"bar": progress_bar(), "json": json_lines(), "none": None}[progress]
+
+    engine = InputFileEngine(args.report[0], ProgressReporter(callback)) #calling the constructor - Initlializing the class with report name
+
+    if args.shards:
+        engine.diff_shards = args.shards
+    if args.memory_budget:
+        engine.memory_budget = parse_size(args.memory_budget)
+    if args.profile:
+        engine.profile_enabled = True
+
+    try:
+        if args.preview:
+            print(json.dumps(engine.preview(args.sample_rows, args.sample_method), indent=2))
+            return
+
+        engine.run(force=args.force) #running the main fun.
+    except SkipRun as e:
+        print(f"[SKIP] {e}")
+    except MemoryBudgetExceeded as e:
+        print(f"[FAILED] {e}", file=sys.stderr)
+        sys.exit(2)
 
 if __name__ == "__main__":
     main()
     #To Run the engine: python -m engine.cli --report <REPORT_NAME>
     #Example: python -m engine.cli --report "Apollo 10G"
-    
\ No newline at end of file
+    #Preview: python -m engine.cli --report "Apollo 10G" --preview --sample-method reservoir
+    #Watch all reports: python -m engine.cli --watch
+    #Profile a run: python -m engine.cli --report "Apollo 10G" --force --profile
@@ -0,0 +1,119 @@
+# engine/comparators.py
+
+import numpy as np
+import pandas as pd
+
+from engine.normalizer import DataNormalizer
+
+COMPARATORS = {}
+
+TRUE_VALUES = {"true", "t", "yes", "y", "1"}
+FALSE_VALUES = {"false", "f", "no", "n", "0"}
+
+
+def register_comparator(*data_types):
+    """
+    Register a Comparator class for one or more mapping 'Data Type' values
+    (matched lower-case).
+    """
+    def wrap(cls):
+        instance = cls()
+        for data_type in data_types:
+            COMPARATORS[data_type] = instance
+        return cls
+    return wrap
+
+
+def get_comparator(data_type):
+    # Blank / unknown data types compare as text
+    return COMPARATORS.get(str(data_type).strip().lower(), COMPARATORS["text"])
+
+
+def comparable_text(values):
+    """
+    Vectorized DataNormalizer.comparable_text for an object Series of str.
+    """
+    return (
+        values.str.replace("–", "-", regex=False)
+        .str.replace("—", "-", regex=False)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+
+class Comparator:
+    """
+    Column-level normalize-and-compare for one mapping data type.
+
+    format() turns normalized source/Sitetracker values into the value
+    written to the upload file, plus a mask of values that are valid for
+    the type. key() maps formatted values to a comparison key; two
+    values are equal when their keys are equal.
+    """
+
+    def format(self, values):
+        return values, np.ones(len(values), dtype=bool)
+
+    def key(self, values):
+        return comparable_text(values)
+
+    def equal(self, left, right):
+        return self.key(left).to_numpy() == self.key(right).to_numpy()
+
+    def compare_codes(self, dictionary, src_codes, st_codes):
+        """
+        Compare a dictionary-encoded column pair: dictionary holds the
+        distinct normalized values of both sides, src_codes / st_codes
+        index into it row by row. Each distinct value is formatted and
+        keyed once, then rows compare by integer key code.
+
+        Returns (formatted source values, ok mask, changed mask).
+        """
+        formatted, ok = self.format(pd.Series(dictionary, dtype=object))
+        key_codes, _ = pd.factorize(self.key(formatted), use_na_sentinel=False)
+
+        ok = ok[src_codes]
+        changed = ok & (key_codes[src_codes] != key_codes[st_codes])
+        return formatted.to_numpy()[src_codes], ok, changed
+
+
+@register_comparator("text", "string", "textarea", "nan", "")
+class TextComparator(Comparator):
+    pass
+
+
+@register_comparator("picklist", "multipicklist")
+class PicklistComparator(Comparator):
+    def key(self, values):
+        return comparable_text(values).str.casefold()
+
+
+@register_comparator("number", "double", "int", "integer", "currency", "percent")
+class NumberComparator(Comparator):
+    def key(self, values):
+        text = comparable_text(values)
+        cleaned = text.str.replace(r"[,\s]", "", regex=True).str.rstrip("%")
+        numbers = pd.to_numeric(cleaned, errors="coerce")
+        # Numbers compare by value (1 == 1.0 == 1,000/1000); anything else as text
+        return text.where(numbers.isna(), numbers.astype(str))
+
+
+@register_comparator("boolean", "checkbox")
+class BooleanComparator(Comparator):
+    def key(self, values):
+        text = comparable_text(values)
+        lowered = text.str.lower()
+        return text.mask(lowered.isin(TRUE_VALUES), "true").mask(lowered.isin(FALSE_VALUES), "false")
+
+
+@register_comparator("date")
+class DateComparator(Comparator):
+    def format(self, values):
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        parsed = [DataNormalizer.normalize_date_uk(v) for v in uniques]
+
+        formatted = np.empty(len(parsed), dtype=object)
+        formatted[:] = [p[0] for p in parsed]
+        ok = np.array([p[1] for p in parsed], dtype=bool)
+
+        return pd.Series(formatted[codes], index=values.index), ok[codes]
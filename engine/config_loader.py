@@ -1,17 +1,22 @@
+import glob
 import os
+
 import yaml
 
 
 class YamlConfigLoader:
     @staticmethod
-    def load(report_name: str) -> dict:
-        base_dir = os.getcwd()
-        path = os.path.join(
-            base_dir,
+    def path(report_name: str, base_dir: str = None) -> str:
+        return os.path.join(
+            base_dir or os.getcwd(),
             "configs",
             report_name.lower().replace(" ", "_") + ".yml"
         )
 
+    @staticmethod
+    def load(report_name: str) -> dict:
+        path = YamlConfigLoader.path(report_name)
+
         if not os.path.exists(path):
             raise Exception(f"YAML config not found: {path}")
 
@@ -21,4 +26,19 @@ class YamlConfigLoader:
         if not isinstance(cfg, dict):
             raise Exception(f"Invalid YAML config for report: {report_name}")
 
-        return cfg
\ No newline at end of file
+        return cfg
+
+
+def configured_reports(config_dir=None):
+    """
+    report.name of every configs/*.yml
+    """
+    config_dir = config_dir or os.path.join(os.getcwd(), "configs")
+    reports = []
+    for path in sorted(glob.glob(os.path.join(config_dir, "*.yml"))):
+        with open(path, "r") as f:
+            cfg = yaml.safe_load(f) or {}
+        name = (cfg.get("report") or {}).get("name")
+        if name:
+            reports.append(name)
+    return reports
@@ -0,0 +1,239 @@
+# engine/differ.py
+
+import numpy as np
+import pandas as pd
+
+from engine.comparators import get_comparator
+from engine.normalizer import DataNormalizer
+from engine.primary_key import key_labels
+
+CHANGE_COLUMNS = [
+    "Project Reference",
+    "Id",
+    "Source Column",
+    "Sitetracker Column",
+    "API Field",
+    "Old Value",
+    "New Value",
+]
+
+
+def _encoded(df, col, positions):
+    """
+    df[col] at the given row positions as (codes, distinct values), each
+    distinct value passed through normalize_value() once; a missing
+    column reads as all blank.
+    """
+    if col not in df.columns:
+        return np.zeros(len(positions), dtype=np.intp), np.array([""], dtype=object)
+
+    codes, uniques = pd.factorize(df[col].iloc[positions], use_na_sentinel=False)
+    values = np.empty(len(uniques), dtype=object)
+    values[:] = [DataNormalizer.normalize_value(v) for v in np.asarray(uniques, dtype=object)]
+    return codes, values
+
+
+def _shared_codes(src, st):
+    """
+    Re-code two _encoded() columns into one shared dictionary of distinct
+    normalized values: (src codes, st codes, dictionary).
+    """
+    (src_codes, src_values), (st_codes, st_values) = src, st
+    shared, dictionary = pd.factorize(np.concatenate([src_values, st_values]))
+    return (
+        shared[:len(src_values)][src_codes],
+        shared[len(src_values):][st_codes],
+        np.asarray(dictionary, dtype=object)
+    )
+
+
+def _first_seen_columns(base, field_cols, present):
+    """
+    Column order pandas gives a list of update dicts: keys in order of
+    first appearance, where a field is absent from rows it was skipped on
+    (invalid dates). That is: by first row present, then mapping order.
+    """
+    has = present.any(axis=0)
+    first = present.argmax(axis=0)
+
+    position = {}
+    for j, col in enumerate(field_cols):
+        if has[j] and col not in base:
+            position[col] = min(position.get(col, (first[j], j)), (first[j], j))
+
+    return list(base) + sorted(position, key=position.get)
+
+
+def diff_rows(valid_src, st_df, pk_src, pk_st, sf_id_col, field_map, row_ids=None,
+              progress=None, label_cols=None):
+    """
+    Column-at-a-time diff of source rows against the first Sitetracker
+    row with the same primary key. label_cols names the key part columns
+    of a composite key, whose label is shown in place of the key in the
+    outputs; it is built only for the rows that reach them.
+
+    Returns the unordered pieces of the result, each tagged with the
+    source row number (row_ids, default 0..n-1) and mapping position it
+    came from, so pieces from several key partitions can be merged by
+    merge_diffs() into one deterministic result.
+    """
+    st_first = st_df.drop_duplicates(subset=[pk_st], keep="first")
+    st_keys = pd.Index(np.asarray(st_first[pk_st].astype(object)))
+
+    src_keys = np.asarray(valid_src[pk_src].astype(object))
+    st_pos = st_keys.get_indexer(src_keys)
+    src_pos = np.flatnonzero(st_pos >= 0)
+    st_pos = st_pos[src_pos]
+
+    row_ids = np.arange(len(valid_src)) if row_ids is None else np.asarray(row_ids)
+    src_rows = row_ids[src_pos]
+
+    keys = src_keys[src_pos]
+    ids = np.asarray(st_first[sf_id_col].astype(object))[st_pos]
+    n = len(src_pos)
+
+    fields = _value_fields(field_map, pk_src)
+
+    values, present, changed = [], [], []
+    invalid_parts, change_parts = [], []
+
+    for col_idx, (src_col, st_col, api_col, dtype) in enumerate(fields):
+        comparator = get_comparator(dtype)
+
+        src_codes, st_codes, dictionary = _shared_codes(
+            _encoded(valid_src, src_col, src_pos),
+            # The Sitetracker key is the lookup index, never a value
+            _encoded(st_first, st_col if st_col != pk_st else None, st_pos)
+        )
+        src_fmt, ok, diff = comparator.compare_codes(dictionary, src_codes, st_codes)
+
+        values.append(src_fmt)
+        present.append(ok)
+        changed.append(diff)
+
+        bad = np.flatnonzero(~ok)
+        if len(bad):
+            invalid_parts.append((bad, col_idx, src_col, dictionary[src_codes[bad]]))
+
+        rows = np.flatnonzero(diff)
+        if len(rows):
+            change_parts.append((rows, col_idx, pd.DataFrame({
+                "Id": ids[rows],
+                "Source Column": src_col,
+                "Sitetracker Column": st_col,
+                "API Field": api_col,
+                "Old Value": dictionary[st_codes[rows]],
+                "New Value": src_fmt[rows]
+            })))
+
+        if progress is not None:
+            progress(len(valid_src) * (col_idx + 1) // len(fields))
+
+    any_changed = np.logical_or.reduce(changed) if changed else np.zeros(n, dtype=bool)
+    update_rows = np.flatnonzero(any_changed)
+
+    if label_cols is not None:
+        # Changed rows are all update rows; only these and invalid dates show a key
+        shown = update_rows
+        if invalid_parts:
+            shown = np.union1d(shown, np.concatenate([p[0] for p in invalid_parts]))
+        keys = np.empty(n, dtype=object)
+        keys[shown] = key_labels(valid_src, label_cols, src_pos[shown])
+
+    for rows, _, changes in change_parts:
+        changes.insert(0, "Project Reference", keys[rows])
+
+    part = {
+        "invalid": np.concatenate([
+            np.asarray([f"{k} | {src_col}: {v}" for k, v in zip(keys[bad], raw)], dtype=object)
+            for bad, _, src_col, raw in invalid_parts
+        ]) if invalid_parts else np.empty(0, dtype=object),
+        "invalid_rows": np.concatenate([src_rows[p[0]] for p in invalid_parts])
+        if invalid_parts else np.empty(0, dtype=np.int64),
+        "invalid_cols": np.concatenate([np.full(len(p[0]), p[1]) for p in invalid_parts])
+        if invalid_parts else np.empty(0, dtype=np.int64),
+        "changes": pd.concat([p[2] for p in change_parts], ignore_index=True)
+        if change_parts else None,
+        "change_rows": np.concatenate([src_rows[p[0]] for p in change_parts])
+        if change_parts else np.empty(0, dtype=np.int64),
+        "change_cols": np.concatenate([np.full(len(p[0]), p[1]) for p in change_parts])
+        if change_parts else np.empty(0, dtype=np.int64),
+    }
+
+    updates_df = pd.DataFrame({"Id": ids[update_rows], pk_src: keys[update_rows]})
+    for (_, _, api_col, _), vals, ok in zip(fields, values, present):
+        # A repeated API name keeps its earlier value where this one is invalid
+        previous = (
+            updates_df[api_col].to_numpy() if api_col in updates_df.columns
+            else np.full(len(update_rows), np.nan, dtype=object)
+        )
+        updates_df[api_col] = np.where(ok[update_rows], vals[update_rows], previous)
+
+    part["updates"] = updates_df
+    part["update_rows"] = src_rows[update_rows]
+    part["present"] = (
+        np.column_stack(present)[update_rows] if present
+        else np.zeros((len(update_rows), 0), dtype=bool)
+    )
+    return part
+
+
+def merge_diffs(parts, pk_src, field_map):
+    """
+    Combine diff_rows() pieces into (updates_df, changes_df, invalid_dates),
+    ordered row-major: by source row, then by mapping order.
+    """
+    invalid_rows = np.concatenate([p["invalid_rows"] for p in parts])
+    invalid_dates = []
+    if len(invalid_rows):
+        invalid_cols = np.concatenate([p["invalid_cols"] for p in parts])
+        texts = np.concatenate([p["invalid"] for p in parts])
+        invalid_dates = texts[np.lexsort((invalid_cols, invalid_rows))].tolist()
+
+    change_frames = [p["changes"] for p in parts if p["changes"] is not None]
+    if change_frames:
+        rows = np.concatenate([p["change_rows"] for p in parts])
+        cols = np.concatenate([p["change_cols"] for p in parts])
+        changes_df = pd.concat(change_frames, ignore_index=True)
+        changes_df = changes_df.iloc[np.lexsort((cols, rows))].reset_index(drop=True)
+    else:
+        changes_df = pd.DataFrame()
+
+    update_frames = [p["updates"] for p in parts if len(p["updates"])]
+    if not update_frames:
+        return pd.DataFrame(), changes_df, invalid_dates
+
+    order = np.argsort(
+        np.concatenate([p["update_rows"] for p in parts if len(p["updates"])]),
+        kind="stable"
+    )
+    updates_df = pd.concat(update_frames, ignore_index=True).iloc[order].reset_index(drop=True)
+    present_rows = np.concatenate([p["present"] for p in parts if len(p["updates"])])[order]
+
+    field_cols = [api_col for _, _, api_col, _ in _value_fields(field_map, pk_src)]
+    columns = _first_seen_columns(["Id", pk_src], field_cols, present_rows)
+
+    return updates_df[columns], changes_df, invalid_dates
+
+
+def _value_fields(field_map, pk_src):
+    return [
+        (src_col, st_col, api_col, dtype)
+        for src_col, st_col, api_col, dtype in field_map
+        if src_col != pk_src
+    ]
+
+
+def diff_frames(valid_src, st_df, pk_src, pk_st, sf_id_col, field_map, progress=None,
+                label_cols=None):
+    """
+    Diff source rows against Sitetracker in one go.
+
+    Returns (updates_df, changes_df, invalid_dates), row-for-row identical
+    to processing each source row and mapped field in turn.
+    """
+    part = diff_rows(
+        valid_src, st_df, pk_src, pk_st, sf_id_col, field_map,
+        progress=progress, label_cols=label_cols
+    )
+    return merge_diffs([part], pk_src, field_map)
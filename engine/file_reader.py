@@ -0,0 +1,288 @@
+# engine/file_reader.py
+
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas._libs.parsers import STR_NA_VALUES
+from pandas.io.parsers import TextParser
+
+from engine.normalizer import DataNormalizer
+
+# Added to the loaded frame when a folder holds several input files
+PROVENANCE_COLUMN = "Input File"
+# Added to the source frame when several sheets are stacked
+SHEET_COLUMN = "Source Sheet"
+# Rows parsed per block / record batch, so reading never holds a whole file as Python objects
+CHUNK_ROWS = 100_000
+# Sheet rows held as Python values before each conversion to Arrow
+SHEET_BLOCK_ROWS = 2_000
+SITETRACKER_ENCODING = "latin1"
+
+
+def _usecols(needed):
+    if needed is None:
+        return None
+    return lambda name: DataNormalizer.clean_header(name) in needed
+
+
+def arrow_frame(table, arrow_strings):
+    """
+    DataFrame of an all-string Arrow table: string[pyarrow] columns that
+    keep the Arrow buffers, or object columns with NaN like read_csv.
+    """
+    if arrow_strings:
+        return table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+    df = table.to_pandas()
+    return df.where(df.notna(), np.nan)
+
+
+def _excel_value(cell):
+    # The cell conversion of pandas' openpyxl reader, so values read as read_excel reads them
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+
+def _excel_text(value):
+    # read_excel(dtype=str): blanks and the default NA markers are missing, the rest str()
+    if isinstance(value, str):
+        return None if value in STR_NA_VALUES else value
+    if isinstance(value, float) and value != value:
+        return None
+    return str(value)
+
+
+def _stream_sheet(ws, header, needed):
+    """
+    One worksheet as an all-string Arrow table, same rows, columns and
+    values as read_excel(dtype=str, usecols=needed). Rows are streamed
+    and converted to Arrow every SHEET_BLOCK_ROWS rows, so only the kept
+    columns of one block are ever held as Python objects.
+    """
+    ws.reset_dimensions()
+    rows = ws.rows
+    for _ in range(header):
+        next(rows, None)
+
+    header_row = [_excel_value(c) for c in next(rows, ())]
+    while header_row and header_row[-1] == "":
+        header_row.pop()
+    # Empty, numeric and duplicate headers named exactly as read_excel names them
+    names = [str(n) for n in TextParser([header_row], header=0).read().columns] if header_row else []
+
+    def name(i):
+        return names[i] if i < len(names) else f"Unnamed: {i}"
+
+    def wanted(i):
+        return needed is None or DataNormalizer.clean_header(name(i)) in needed
+
+    keep = [i for i in range(len(names)) if wanted(i)]
+    blocks, block, pending_blank, width = [], [], 0, len(names)
+
+    def flush():
+        if block:
+            blocks.append(pa.table(
+                {name(i): pa.array([r[j] for r in block], type=pa.string()) for j, i in enumerate(keep)}
+            ))
+            block.clear()
+
+    for row in rows:
+        values = [_excel_value(c) for c in row]
+        while values and values[-1] == "":
+            values.pop()
+        if not values:
+            # Blank rows count only when data follows them
+            pending_blank += 1
+            continue
+
+        if len(values) > width:
+            if needed is None or any(wanted(i) for i in range(width, len(values))):
+                flush()
+                keep += [i for i in range(width, len(values)) if wanted(i)]
+            width = len(values)
+
+        block.extend([[None] * len(keep)] * pending_blank)
+        pending_blank = 0
+        block.append([_excel_text(values[i]) if i < len(values) else None for i in keep])
+        if len(block) >= SHEET_BLOCK_ROWS:
+            flush()
+    flush()
+
+    schema = pa.schema([(name(i), pa.string()) for i in keep])
+    if not blocks:
+        return schema.empty_table()
+    return pa.concat_tables(blocks, promote_options="default").select(schema.names)
+
+
+def _worksheet(wb, sheet):
+    return wb.worksheets[sheet] if isinstance(sheet, int) else wb[sheet]
+
+
+def _read_workbook(path, sheets, needed=None, arrow_strings=False):
+    """
+    The selected sheets of one workbook, in order. The workbook is opened
+    once, so its shared strings and styles are parsed once for all of
+    its sheets.
+    """
+    if not arrow_strings:
+        with pd.ExcelFile(path) as xl:
+            return [
+                xl.parse(s["name"], header=s.get("header", 0), dtype=str, usecols=_usecols(needed))
+                for s in sheets
+            ]
+
+    wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        return [
+            arrow_frame(_stream_sheet(_worksheet(wb, s["name"]), s.get("header", 0), needed), True)
+            for s in sheets
+        ]
+    finally:
+        wb.close()
+
+
+def read_source_files(paths, needed=None, sheets=None, max_workers=4, arrow_strings=False):
+    """
+    Read the selected sheets of every source workbook and stack them,
+    tagged with their file and sheet when there are several.
+
+    sheets is a list of {"name": ..., "header": <0-based header row>};
+    None reads the first sheet. Each workbook is opened once and its
+    sheets read in turn; several workbooks are read concurrently in a
+    process pool. Sheets of one workbook are not split across processes:
+    openpyxl cannot share a parsed workbook, so every extra process would
+    re-open the file and re-parse its shared strings.
+    """
+    sheets = sheets or [{"name": 0, "header": 0}]
+
+    if len(paths) == 1:
+        workbooks = [_read_workbook(paths[0], sheets, needed, arrow_strings)]
+    else:
+        workers = max(1, min(max_workers, len(paths)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            workbooks = list(pool.map(
+                _read_workbook,
+                paths,
+                [sheets] * len(paths),
+                [needed] * len(paths),
+                [arrow_strings] * len(paths)
+            ))
+
+    frames = []
+    for path, sheet_frames in zip(paths, workbooks):
+        for spec, df in zip(sheets, sheet_frames):
+            df = DataNormalizer.normalize_columns(df)
+            if len(paths) > 1:
+                df[PROVENANCE_COLUMN] = os.path.basename(path)
+            if len(sheets) > 1:
+                df[SHEET_COLUMN] = str(spec["name"])
+            frames.append(df)
+
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def _csv_header(path):
+    with open(path, "r", encoding=SITETRACKER_ENCODING, newline="") as f:
+        header = next(csv.reader(f), [])
+    # Duplicate names get read_csv's ".1", ".2" suffixes
+    return [str(c) for c in TextParser([header], header=0).read().columns] if header else []
+
+
+def sitetracker_batches(path, needed=None, rows=CHUNK_ROWS):
+    """
+    A Sitetracker CSV parsed by Arrow's streaming reader into all-string
+    tables of about rows rows: no Python object per cell, and the same
+    values, missing cells and skipped malformed lines as
+    read_csv(dtype=str, encoding="latin1", on_bad_lines="skip").
+    """
+    names = _csv_header(path)
+    if not names:
+        return
+    columns = [n for n in names if needed is None or DataNormalizer.clean_header(n) in needed]
+
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(
+            encoding=SITETRACKER_ENCODING, column_names=names, skip_rows=1
+        ),
+        parse_options=pa_csv.ParseOptions(
+            newlines_in_values=True, invalid_row_handler=lambda row: "skip"
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={n: pa.string() for n in names},
+            include_columns=columns,
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=True,
+            null_values=sorted(STR_NA_VALUES)
+        )
+    )
+
+    pending, count, yielded = [], 0, False
+    for batch in reader:
+        pending.append(batch)
+        count += batch.num_rows
+        if count >= rows:
+            yield pa.Table.from_batches(pending).combine_chunks()
+            pending, count, yielded = [], 0, True
+    if pending or not yielded:
+        yield pa.Table.from_batches(pending, schema=reader.schema).combine_chunks()
+
+
+def read_sitetracker_file(path, needed=None, nrows=None, chunksize=None, arrow_strings=False):
+    """
+    Sitetracker CSV with every column a string. With chunksize, an
+    iterator of DataFrames of at most about chunksize rows. arrow_strings
+    returns string[pyarrow] columns backed by the parsed Arrow buffers.
+    """
+    if chunksize is not None:
+        return (
+            arrow_frame(table, arrow_strings)
+            for table in sitetracker_batches(path, needed, chunksize)
+        )
+
+    tables, count = [], 0
+    for table in sitetracker_batches(path, needed, nrows or CHUNK_ROWS):
+        tables.append(table)
+        count += table.num_rows
+        if nrows is not None and count >= nrows:
+            break
+
+    table = pa.concat_tables(tables)
+    if nrows is not None:
+        table = table.slice(0, nrows)
+    return arrow_frame(table, arrow_strings)
+
+
+def _read_one(reader, path, needed):
+    df = DataNormalizer.normalize_columns(reader(path, needed))
+    df[PROVENANCE_COLUMN] = os.path.basename(path)
+    return df
+
+
+def read_files(reader, paths, needed=None, max_workers=4):
+    """
+    Read several input files with a process pool (Excel parsing is
+    CPU-bound) and stack them in folder order, tagging every row with the
+    file it came from. A single file is read in-process without a
+    provenance column.
+    """
+    if len(paths) == 1:
+        return reader(paths[0], needed)
+
+    workers = max(1, min(max_workers, len(paths)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(_read_one, [reader] * len(paths), paths, [needed] * len(paths)))
+
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,309 @@
+# engine/golden.py
+#
+# Golden-output harness: runs the signed-off legacy script
+# (<work_dir>/backup/create_input_file.py) and the engine on the backed-up
+# sample inputs in throwaway workspaces, diffs every output cell by cell and
+# reports the relative runtime.
+#
+# Run: python -m engine.golden [--report "Apollo 10G"] [--repeat 3] [--out DIR]
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import yaml
+
+from engine.config_loader import YamlConfigLoader, configured_reports
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEGACY_SCRIPT = "create_input_file.py"
+COMPARED_OUTPUTS = [
+    "final_input_file.csv",
+    "field_level_changes.csv",
+    "invalid_primary_key.csv",
+    "duplicate_primary_keys.csv",
+    "run_summary.txt",
+]
+# The engine runs with the legacy output contract: whole source rows in
+# every diagnostic file, no reconciliation section or unmatched_keys.csv,
+# one full final_input_file.csv
+LEGACY_CONTRACT = {
+    "loading": {"mapped_columns_only": False},
+    "reconcile": {"enabled": False},
+    "mirror": {"enabled": False},
+    "output": {"mode": "full", "xlsx": False},
+    "profile": {"enabled": False},
+}
+# Lines that legitimately differ between any two runs
+VOLATILE_PREFIXES = ("Run time:",)
+MAX_REPORTED_CELLS = 20
+
+
+def _mapping_dir():
+    for name in ("Common", "common"):
+        path = os.path.join(REPO_DIR, name)
+        if os.path.isdir(path):
+            return path
+    raise Exception("Mapping folder (Common/) not found")
+
+
+def _sample_inputs(backup_dir):
+    files = sorted(f for f in os.listdir(backup_dir) if not f.startswith("."))
+    source = [f for f in files if f.lower().endswith((".xlsx", ".xls"))]
+    sitetracker = [f for f in files if f.lower().endswith(".csv")]
+    return source, sitetracker
+
+
+def _workspace(root, folders, backup_dir, source, sitetracker):
+    """
+    <root>/Common + <root>/<work_dir>/<source_dir|sitetracker_dir>, the
+    layout both the legacy script and the engine expect.
+    """
+    shutil.copytree(_mapping_dir(), os.path.join(root, "Common"))
+    base = os.path.join(root, folders["work_dir"])
+    for folder, names in ((folders["source_dir"], source), (folders["sitetracker_dir"], sitetracker)):
+        dest = os.path.join(base, folder)
+        os.makedirs(dest)
+        for name in names:
+            shutil.copy2(os.path.join(backup_dir, name), dest)
+    return base
+
+
+def _timed(cmd, cwd, env=None):
+    start = time.perf_counter()
+    result = subprocess.run(cmd, cwd=cwd, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise Exception(f"{' '.join(cmd)} failed:\n{result.stderr.strip() or result.stdout.strip()}")
+    return elapsed
+
+
+def _run_dir(base, runs="runs"):
+    runs_dir = os.path.join(base, runs)
+    runs = sorted(
+        os.path.join(runs_dir, day, run)
+        for day in os.listdir(runs_dir)
+        for run in os.listdir(os.path.join(runs_dir, day))
+    )
+    if not runs:
+        raise Exception(f"No run folder produced under {runs_dir}")
+    return runs[-1]
+
+
+def run_legacy(report_cfg, backup_dir, source, sitetracker, root):
+    # The legacy scripts hard-code input/source and input/sitetracker
+    folders = dict(report_cfg["folders"], source_dir="input/source", sitetracker_dir="input/sitetracker")
+    base = _workspace(root, folders, backup_dir, source, sitetracker)
+    shutil.copy2(os.path.join(backup_dir, LEGACY_SCRIPT), base)
+    elapsed = _timed([sys.executable, LEGACY_SCRIPT], cwd=base)
+    return _run_dir(base), elapsed
+
+
+def _legacy_config(report_name, report_cfg, root):
+    cfg = dict(report_cfg)
+    for section, values in LEGACY_CONTRACT.items():
+        cfg[section] = dict(cfg.get(section) or {}, **values)
+    with open(YamlConfigLoader.path(report_name, root), "w") as f:
+        yaml.safe_dump(cfg, f, sort_keys=False)
+
+
+def run_engine(report_name, report_cfg, backup_dir, source, sitetracker, root):
+    base = _workspace(root, report_cfg["folders"], backup_dir, source, sitetracker)
+    shutil.copytree(os.path.join(REPO_DIR, "configs"), os.path.join(root, "configs"))
+    _legacy_config(report_name, report_cfg, root)
+
+    env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    elapsed = _timed(
+        [sys.executable, "-m", "engine.cli", "--report", report_name,
+         "--force", "--progress", "none"],
+        cwd=root, env=env
+    )
+    return _run_dir(base, report_cfg["folders"]["runs_dir"]), elapsed
+
+
+def _read_csv(path):
+    try:
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+
+
+def compare_csv(legacy_path, engine_path):
+    legacy, engine = _read_csv(legacy_path), _read_csv(engine_path)
+    result = {
+        "legacy_shape": list(legacy.shape),
+        "engine_shape": list(engine.shape),
+        "legacy_only_columns": [c for c in legacy.columns if c not in engine.columns],
+        "engine_only_columns": [c for c in engine.columns if c not in legacy.columns],
+        "column_order_matches": list(legacy.columns) == list(engine.columns),
+    }
+
+    shared = [c for c in legacy.columns if c in engine.columns]
+    rows = min(len(legacy), len(engine))
+    left = legacy[shared].iloc[:rows].to_numpy()
+    right = engine[shared].iloc[:rows].to_numpy()
+    mismatch_rows, mismatch_cols = (left != right).nonzero() if rows and shared else ((), ())
+
+    result["cell_mismatches"] = len(mismatch_rows)
+    result["examples"] = [
+        {"row": int(r), "column": shared[c], "legacy": left[r, c], "engine": right[r, c]}
+        for r, c in list(zip(mismatch_rows, mismatch_cols))[:MAX_REPORTED_CELLS]
+    ]
+    result["equal"] = (
+        result["cell_mismatches"] == 0
+        and legacy.shape == engine.shape
+        and result["column_order_matches"]
+    )
+    return result
+
+
+def compare_text(legacy_path, engine_path):
+    def lines(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return [l.rstrip("\n") for l in f if not l.startswith(VOLATILE_PREFIXES)]
+
+    legacy, engine = lines(legacy_path), lines(engine_path)
+    legacy_only = [l for l in legacy if l not in set(engine)]
+    engine_only = [l for l in engine if l not in set(legacy)]
+    return {
+        "equal": legacy == engine,
+        "legacy_only_lines": legacy_only[:MAX_REPORTED_CELLS],
+        "engine_only_lines": engine_only[:MAX_REPORTED_CELLS],
+    }
+
+
+def compare_runs(legacy_dir, engine_dir):
+    files = {}
+    for name in COMPARED_OUTPUTS:
+        legacy_path = os.path.join(legacy_dir, name)
+        engine_path = os.path.join(engine_dir, name)
+        legacy_exists, engine_exists = os.path.exists(legacy_path), os.path.exists(engine_path)
+
+        if not legacy_exists and not engine_exists:
+            continue
+        if legacy_exists != engine_exists:
+            files[name] = {"equal": False, "missing_in": "engine" if legacy_exists else "legacy"}
+        elif name.endswith(".csv"):
+            files[name] = compare_csv(legacy_path, engine_path)
+        else:
+            files[name] = compare_text(legacy_path, engine_path)
+
+    files_extra = sorted(set(os.listdir(engine_dir)) - set(os.listdir(legacy_dir)) - {".viewer"})
+    return files, files_extra
+
+
+def golden_report(report_name, repeat=1, keep_dir=None):
+    cfg = YamlConfigLoader.load(report_name)
+    backup_dir = os.path.join(REPO_DIR, cfg["folders"]["work_dir"], "backup")
+    source, sitetracker = _sample_inputs(backup_dir)
+
+    if not os.path.exists(os.path.join(backup_dir, LEGACY_SCRIPT)):
+        return {"report": report_name, "status": "skipped", "reason": "no legacy script"}
+    if len(source) != 1 or len(sitetracker) != 1:
+        return {
+            "report": report_name, "status": "skipped",
+            "reason": f"needs one source and one Sitetracker sample, found {source} / {sitetracker}"
+        }
+
+    if keep_dir:
+        os.makedirs(keep_dir, exist_ok=True)
+
+    legacy_times, engine_times = [], []
+    for i in range(repeat):
+        root = tempfile.mkdtemp(prefix="golden-", dir=keep_dir)
+        try:
+            legacy_dir, t = run_legacy(cfg, backup_dir, source, sitetracker, os.path.join(root, "legacy"))
+            legacy_times.append(t)
+            engine_dir, t = run_engine(
+                report_name, cfg, backup_dir, source, sitetracker, os.path.join(root, "engine")
+            )
+            engine_times.append(t)
+            if i == 0:
+                files, engine_extra = compare_runs(legacy_dir, engine_dir)
+        finally:
+            if keep_dir is None:
+                shutil.rmtree(root, ignore_errors=True)
+
+    legacy_best, engine_best = min(legacy_times), min(engine_times)
+    return {
+        "report": report_name,
+        "status": "equal" if all(f["equal"] for f in files.values()) else "different",
+        "legacy_seconds": round(legacy_best, 2),
+        "engine_seconds": round(engine_best, 2),
+        "speedup": round(legacy_best / engine_best, 2) if engine_best else None,
+        "files": files,
+        "engine_only_files": engine_extra,
+    }
+
+
+def _preview(names, limit=8):
+    more = f" (+{len(names) - limit} more)" if len(names) > limit else ""
+    return ", ".join(names[:limit]) + more if names else "-"
+
+
+def _print_report(result):
+    print(f"\n=== {result['report']} ===")
+    if result["status"] == "skipped":
+        print(f"SKIPPED: {result['reason']}")
+        return
+
+    print(
+        f"Runtime: legacy {result['legacy_seconds']}s, engine {result['engine_seconds']}s "
+        f"(x{result['speedup']})"
+    )
+    for name, f in result["files"].items():
+        if f["equal"]:
+            print(f"  [same] {name}")
+            continue
+        if "missing_in" in f:
+            print(f"  [DIFF] {name}: missing in {f['missing_in']}")
+        elif "cell_mismatches" in f:
+            print(
+                f"  [DIFF] {name}: legacy {f['legacy_shape']} vs engine {f['engine_shape']}, "
+                f"{f['cell_mismatches']} cells differ"
+            )
+            if f["legacy_only_columns"] or f["engine_only_columns"]:
+                print(f"         legacy-only columns: {_preview(f['legacy_only_columns'])}")
+                print(f"         engine-only columns: {_preview(f['engine_only_columns'])}")
+            for ex in f["examples"][:5]:
+                print(f"         row {ex['row']} [{ex['column']}]: {ex['legacy']!r} != {ex['engine']!r}")
+        else:
+            print(f"  [DIFF] {name}")
+            for line in f["legacy_only_lines"][:5]:
+                print(f"         - {line}")
+            for line in f["engine_only_lines"][:5]:
+                print(f"         + {line}")
+    if result["engine_only_files"]:
+        print(f"  engine-only outputs: {', '.join(result['engine_only_files'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m engine.golden",
+        description="Compare engine outputs and runtime with the legacy scripts"
+    )
+    parser.add_argument("--report", action="append", help="Report name (default: all configured)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per side; the best time is reported")
+    parser.add_argument("--out", help="Write the full JSON report to this file")
+    parser.add_argument("--keep", help="Keep the workspaces under this folder")
+    args = parser.parse_args()
+
+    results = [golden_report(r, args.repeat, args.keep) for r in (args.report or configured_reports())]
+    for result in results:
+        _print_report(result)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, default=str)
+
+    sys.exit(0 if all(r["status"] != "different" for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
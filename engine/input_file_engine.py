@@ -1,21 +1,93 @@
 # engine/input_file_engine.py
 
 import pandas as pd
+import fnmatch
+import hashlib
+import json
 import os
+import random
 import shutil
+import sqlite3
 import sys
+import time
 from datetime import datetime
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 
+import numpy as np
+import pyarrow as pa
+from openpyxl import load_workbook
+
+from engine.archive_store import ArchiveStore, prune_runs
+from engine.change_log import ChangeLogStore
 from engine.config_loader import YamlConfigLoader
+from engine.differ import diff_frames
+from engine.file_reader import (
+    PROVENANCE_COLUMN,
+    SHEET_COLUMN,
+    read_files,
+    read_source_files,
+    read_sitetracker_file
+)
 from engine.mapping_loader import MappingLoader
+from engine.memory_guard import (
+    IN_MEMORY_SHARE,
+    MemoryBudgetExceeded,
+    MemoryGuard,
+    estimate_peak,
+    format_size,
+    parse_size
+)
+from engine.parallel_diff import parallel_diff_frames
+from engine.patch_batches import (
+    PATCH_FILE,
+    PATCH_INDEX_COLUMNS,
+    PATCH_INDEX_FILE,
+    patch_batches
+)
+from engine.progress import ProgressReporter
+from engine.reconcile import SITETRACKER_ONLY, SOURCE_ONLY, reconcile_keys
 from engine.normalizer import DataNormalizer
+from engine.primary_key import PrimaryKey
+from engine.profiler import DEFAULT_INTERVAL, DEFAULT_TOP, RunProfiler
+from engine.run_history import COUNT_COLUMNS, RunHistory, file_sha256
+from engine.snapshot import CHUNK_ROWS, SNAPSHOT_DIR_NAME, SnapshotStore
+from engine.xlsx_writer import XLSX_FILE, write_xlsx
+from salesforce.mirror import ReportMirror
 
 warnings.filterwarnings("ignore", message="Parsing dates", category=UserWarning)
 
+SF_ID_PATTERN = r"^a[0-9A-Za-z]{17}$"
+# Sitetracker input written from the local Salesforce mirror
+MIRROR_INPUT_NAME = "sitetracker_mirror.csv"
+
+
+@lru_cache(maxsize=1)
+def engine_code_hash():
+    """
+    sha256 over the engine's own source files, so an upgrade that changes
+    how outputs are computed never re-links outputs of the old code.
+    """
+    engine_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in sorted(f for f in os.listdir(engine_dir) if f.endswith(".py")):
+        digest.update(name.encode("utf-8"))
+        with open(os.path.join(engine_dir, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class SkipRun(Exception):
+    """
+    Raised when a report's inputs are not there (yet); not an error.
+    """
+
+
 class InputFileEngine:
-    def __init__(self, report_name: str):
+    def __init__(self, report_name: str, progress=None):
         self.report_name = report_name
+        self.progress = progress or ProgressReporter()
         self.yaml_cfg = YamlConfigLoader.load(report_name)
 
         folders = self.yaml_cfg["folders"]
@@ -34,144 +106,603 @@ class InputFileEngine:
 
         self.text_case_columns = self.yaml_cfg.get("text_case_columns", [])
 
-    def _assert_single_file(self, folder, label):
+        self.history_db = self.yaml_cfg.get("history", {}).get(
+            "db_path", RunHistory.default_path()
+        )
+        self.change_log_dir = self.yaml_cfg.get("change_log", {}).get(
+            "path", ChangeLogStore.default_path()
+        )
+
+        loading = self.yaml_cfg.get("loading", {})
+        self.compact_columns = loading.get("compact_columns", True)
+        self.category_max_unique_ratio = loading.get("category_max_unique_ratio", 0.5)
+        self.mapped_columns_only = loading.get("mapped_columns_only", True)
+
+        inputs = self.yaml_cfg.get("inputs", {})
+        self.source_spec = inputs.get("source", {})
+        self.sitetracker_spec = inputs.get("sitetracker", {})
+        self.max_workers = inputs.get("max_workers", 4)
+
+        behavior = self.yaml_cfg.get("behavior", {})
+        self.skip_unchanged_inputs = behavior.get("skip_unchanged_inputs", True)
+
+        self.archive_compression = self.yaml_cfg.get("archive", {}).get("compression", "gzip")
+        self.retention = self.yaml_cfg.get("retention") or {}
+
+        diff_cfg = self.yaml_cfg.get("diff", {})
+        self.diff_shards = diff_cfg.get("shards", 1)
+        self.diff_workers = diff_cfg.get("max_workers", 4)
+
+        self.reconcile = self.yaml_cfg.get("reconcile", {})
+
+        output = self.yaml_cfg.get("output", {})
+        self.output_mode = output.get("mode", "full")
+        self.patch_batch_size = output.get("batch_size", 10_000)
+        self.write_xlsx = output.get("xlsx", False)
+        if self.output_mode not in ("full", "changed_only"):
+            raise Exception(f"Unknown output mode: {self.output_mode}")
+
+        snapshot = self.yaml_cfg.get("snapshot", {})
+        self.snapshot_enabled = snapshot.get("enabled", True)
+        self.snapshot_keep = snapshot.get("keep", 5)
+        self.snapshot_dir = os.path.join(self.base_dir, SNAPSHOT_DIR_NAME)
+
+        self.mirror_cfg = self.yaml_cfg.get("mirror") or {}
+
+        profile = self.yaml_cfg.get("profile") or {}
+        self.profile_enabled = profile.get("enabled", False)
+        self.profile_top = profile.get("top", DEFAULT_TOP)
+        self.profile_interval = profile.get("interval", DEFAULT_INTERVAL)
+
+        self.memory_budget = parse_size(self.yaml_cfg.get("memory_budget"))
+        self.memory_strategy = self.yaml_cfg.get("memory_strategy", "auto")
+        if self.memory_strategy not in ("auto", "in_memory", "chunked"):
+            raise Exception(f"Unknown memory strategy: {self.memory_strategy}")
+        self.guard = MemoryGuard(self.memory_budget)
+        self._sitetracker_keys = None
+        self.primary_key = None
+        self.run_dir = None
+
+    def _collect_inputs(self):
+        source_files = self._input_files(self.source_dir, "Source", self.source_spec)
+        if self.mirror_cfg.get("enabled", False):
+            return source_files, [self._mirror_input()]
+        st_files = self._input_files(self.sitetracker_dir, "Sitetracker", self.sitetracker_spec)
+        return source_files, st_files
+
+    def _mirror_input(self):
+        """
+        Sitetracker input written from the local mirror
+        (salesforce/mirror.py), rewritten only when the mirror has been
+        synced since. sync_before_run syncs it first (needs a login).
+        """
+        report_mirror = ReportMirror(
+            self._mapping().mapping_df, self.mirror_cfg, self.base_dir
+        )
+        if self.mirror_cfg.get("sync_before_run", False):
+            for result in report_mirror.sync():
+                print(
+                    f"[MIRROR] {result['sobject']}: {result['mode']}, "
+                    f"{result['upserted']} upserted, {result['deleted']} deleted"
+                )
+
+        synced_at = report_mirror.synced_at()
+        if synced_at is None:
+            raise self._mirror_not_synced()
+
+        path = os.path.join(self.sitetracker_dir, MIRROR_INPUT_NAME)
+        if not os.path.exists(path) or \
+                datetime.fromtimestamp(os.path.getmtime(path), synced_at.tzinfo) < synced_at:
+            rows = report_mirror.write_sitetracker_csv(path)
+            print(f"[MIRROR] {rows} Sitetracker rows written to {path}")
+        return path
+
+    def _mirror_frame(self):
+        """
+        Sitetracker input read from the local mirror into memory, as
+        preview needs it: never synced first and never written out.
+        """
+        if not os.path.exists(ReportMirror.db_path(self.mirror_cfg, self.base_dir)):
+            raise self._mirror_not_synced()
+
+        report_mirror = ReportMirror(
+            self._mapping().mapping_df, self.mirror_cfg, self.base_dir
+        )
+        if report_mirror.synced_at() is None:
+            raise self._mirror_not_synced()
+        return report_mirror.sitetracker_frame()
+
+    def _mirror_not_synced(self):
+        return SkipRun(
+            "Sitetracker mirror not synced yet: "
+            f'python -m salesforce.mirror --report "{self.report_name}"'
+        )
+
+    def _input_files(self, folder, label, spec):
+        """
+        Input files in folder matching spec["pattern"] (glob, default "*").
+        Exactly one file is required unless spec["multiple"] is set.
+        """
         if not os.path.exists(folder):
-            print(f"[SKIP] {label} folder does not exist: {folder}")
-            sys.exit(0)
+            raise SkipRun(f"{label} folder does not exist: {folder}")
 
-        files = [f for f in os.listdir(folder) if not f.startswith(".")]
+        pattern = spec.get("pattern", "*")
+        files = sorted(
+            f for f in os.listdir(folder)
+            if not f.startswith(".") and fnmatch.fnmatch(f, pattern)
+        )
 
         if len(files) == 0:
-            print(f"[SKIP] No files found in {label} folder")
-            sys.exit(0)
+            raise SkipRun(f"No files found in {label} folder")
 
-        if len(files) > 1:
+        if len(files) > 1 and not spec.get("multiple", False):
             raise Exception(f"{label} folder must contain exactly ONE file")
 
-        return os.path.join(folder, files[0])
+        return [os.path.join(folder, f) for f in files]
 
-    def run(self):
-        print("ENGINE STARTED")
-        source_file = self._assert_single_file(self.source_dir, "Source")
-        st_file = self._assert_single_file(self.sitetracker_dir, "Sitetracker")
+    def _needed_columns(self, pk_src, pk_st, field_map):
+        src_cols = {*self.primary_key.src_columns, *self.text_case_columns}
+        st_cols = set(self.primary_key.st_columns)
+        for src_col, st_col, _, _ in field_map:
+            src_cols.add(src_col)
+            st_cols.add(st_col)
+        return src_cols, st_cols
 
-        run_day = datetime.now().strftime("%Y-%m-%d")
-        run_time = datetime.now().strftime("run_%H-%M-%S")
-        run_dir = os.path.join(self.runs_dir, run_day, run_time)
-        os.makedirs(run_dir, exist_ok=True)
+    def _snapshot(self, store, path, sha256=None, readonly=False):
+        """
+        sha256 of the snapshot to read for path, built on first use; None
+        when snapshots are off. readonly (preview) never builds or touches
+        one: None unless it already exists.
+        """
+        if not self.snapshot_enabled:
+            return None
+        if not readonly:
+            return store.ensure(path, sha256)
+        sha256 = sha256 or file_sha256(path)
+        return sha256 if os.path.exists(store.path(sha256)) else None
 
-        def out(name):
-            return os.path.join(run_dir, name)
+    def _sitetracker_id_candidates(self, st_file, sha256=None, readonly=False, sample_rows=500):
+        store = SnapshotStore(self.snapshot_dir)
+        snapshot = self._snapshot(store, st_file, sha256, readonly)
+        if snapshot:
+            sample = store.read(snapshot, nrows=sample_rows)
+        else:
+            sample = DataNormalizer.normalize_columns(
+                read_sitetracker_file(st_file, nrows=sample_rows, arrow_strings=True)
+            )
+        return {
+            col for col in sample.columns
+            if DataNormalizer.column_matches(sample[col], SF_ID_PATTERN)
+        }
+
+    def _prepare_frame(self, df):
+        df = DataNormalizer.normalize_columns(df)
+        if self.compact_columns:
+            df = DataNormalizer.compact_frame(df, self.category_max_unique_ratio)
+        return df
 
+    def _mapping(self):
         mapping = MappingLoader(self.mapping_file, self.report_name)
         mapping.load()
-        pk_src, pk_st = mapping.primary_keys()
-        field_map = mapping.field_mapping()
+        return mapping
 
-        src_df = DataNormalizer.normalize_columns(
-            pd.read_excel(source_file, dtype=str)
-        )
+    def _load_mapping(self, mapping=None):
+        """
+        (source key column, Sitetracker key column, field mapping). A
+        composite key's columns are the hashed key columns PrimaryKey.add()
+        sets on the frames.
+        """
+        mapping = mapping or self._mapping()
+        self.primary_key = PrimaryKey(mapping.primary_keys())
+        return self.primary_key.src, self.primary_key.st, mapping.field_mapping()
+
+    def _diff_fields(self, field_map):
+        # Key parts identify the record; only a single key is skipped by the differ itself
+        if not self.primary_key.composite:
+            return field_map
+        return [f for f in field_map if f[0] not in self.primary_key.src_columns]
+
+    def _with_key_labels(self, src_df):
+        # Output files show a composite key as its label, not its hash
+        key = self.primary_key
+        if not key.composite:
+            return src_df
+        return src_df.assign(**{key.src: key.labels(src_df, "source")})
+
+    def _diff_frame(self, src_df, field_map):
+        """
+        The source columns the diff, duplicate check and reconciliation
+        read; with mapped_columns_only the rest of each row stays behind
+        for the diagnostic files.
+        """
+        if not self.mapped_columns_only:
+            return src_df
+        key = self.primary_key
+        wanted = {key.src, *key.src_columns, *(src for src, _, _, _ in field_map)}
+        return src_df[[c for c in src_df.columns if c in wanted]]
+
+    def _label_columns(self):
+        return self.primary_key.src_columns if self.primary_key.composite else None
+
+    def _load_inputs(self, source_files, st_files, pk_src, pk_st, field_map,
+                     src_df=None, st_keys=None, chunked=False, st_shas=None, readonly=False,
+                     st_df=None):
+        """
+        Read and normalize both inputs.
+        src_df may be passed in pre-read (preview sampling), and st_df too
+        (preview from the Sitetracker mirror); st_keys limits
+        the Sitetracker frame to the given primary keys. chunked streams the
+        Sitetracker side, keeping only rows whose key is in the source.
+        st_shas are the Sitetracker files' sha256s when already known;
+        readonly reads existing snapshots but never builds or prunes any.
+        """
+        st_shas = st_shas or [None] * len(st_files)
+        st_needed = None
+        if self.mapped_columns_only and st_df is None:
+            _, st_needed = self._needed_columns(pk_src, pk_st, field_map)
+            id_candidates = self._sitetracker_id_candidates(st_files[0], st_shas[0], readonly)
+            # No Id column in the sample: fall back to reading every column
+            st_needed = st_needed | id_candidates if id_candidates else None
+
+        if src_df is None:
+            # Source rows are always read whole: users fix their rows from
+            # invalid_primary_key.csv and duplicate_primary_keys.csv. The
+            # workbook parser reads every cell either way, and the diff only
+            # ever touches the mapped columns.
+            src_df = read_source_files(
+                source_files, None, self.source_spec.get("sheets"), self.max_workers,
+                arrow_strings=self.compact_columns
+            )
+        src_df = self._prepare_frame(src_df)
 
         for col in self.text_case_columns:
             if col in src_df.columns:
-                src_df[col] = src_df[col].apply(DataNormalizer.normalize_text_case)
-
-        st_df = DataNormalizer.normalize_columns(
-            pd.read_csv(
-                st_file,
-                dtype=str,
-                encoding="latin1",
-                engine="python",
-                on_bad_lines="skip"
+                src_df[col] = DataNormalizer.map_column(
+                    src_df[col], DataNormalizer.normalize_text_case
+                )
+
+        key = self.primary_key
+        if st_df is not None:
+            st_df = self._prepare_frame(st_df)
+        elif chunked:
+            src_keys = key.values(src_df, "source")
+            st_keys = set(src_keys.dropna()) if st_keys is None else set(st_keys) & set(src_keys)
+            st_df = self._prepare_frame(
+                self._read_sitetracker_chunked(st_files, st_needed, pk_st, st_keys, st_shas)
+            )
+        else:
+            st_df = self._prepare_frame(
+                self._read_sitetracker(st_files, st_needed, st_shas, readonly)
             )
-        )
 
         sf_id_col = next(
             col for col in st_df.columns
-            if st_df[col].astype(str).str.match(r"^a[0-9A-Za-z]{17}$").any()
+            if DataNormalizer.column_matches(st_df[col], SF_ID_PATTERN)
         )
 
-        src_df[pk_src] = src_df[pk_src].apply(DataNormalizer.normalize_value)
-        st_df[pk_st] = st_df[pk_st].apply(DataNormalizer.normalize_value)
+        src_df = key.add(src_df, "source")
+        st_df = key.add(st_df, "sitetracker")
 
-        src_df["VALID"] = src_df[pk_src].apply(DataNormalizer.valid_project_ref)
-        src_df[~src_df["VALID"]].to_csv(out("invalid_primary_key.csv"), index=False)
+        if st_keys is not None:
+            st_df = st_df[st_df[pk_st].isin(st_keys)]
 
-        valid_src = src_df[src_df["VALID"]]
-        st_index = st_df.set_index(pk_st)
+        src_df["VALID"] = key.valid(src_df)
 
-        non_empty_pk_df = valid_src[
-            valid_src[pk_src].notna() &
-            (valid_src[pk_src].str.strip() != "")
-        ]
+        return src_df, st_df, sf_id_col
+
+    def _read_sitetracker(self, st_files, needed, shas, readonly=False):
+        """
+        Sitetracker frame from the memory-mapped snapshots of st_files,
+        building any that are missing (in a process pool when several).
+        readonly maps the snapshots that exist and parses the other files
+        in memory.
+        """
+        if not self.snapshot_enabled:
+            reader = partial(read_sitetracker_file, arrow_strings=self.compact_columns)
+            return read_files(reader, st_files, needed, self.max_workers)
+
+        store = SnapshotStore(self.snapshot_dir)
+        shas = [sha or file_sha256(path) for path, sha in zip(st_files, shas)]
+
+        missing = [(p, s) for p, s in zip(st_files, shas) if not os.path.exists(store.path(s))]
+        if len(missing) > 1 and not readonly:
+            workers = max(1, min(self.max_workers, len(missing)))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(store.ensure, *zip(*missing)))
+
+        frames = []
+        for path, sha in zip(st_files, shas):
+            snapshot = self._snapshot(store, path, sha, readonly)
+            if snapshot:
+                df = store.read(snapshot, needed, arrow_strings=self.compact_columns)
+            else:
+                df = read_sitetracker_file(path, needed, arrow_strings=self.compact_columns)
+            if len(st_files) > 1:
+                df[PROVENANCE_COLUMN] = os.path.basename(path)
+            frames.append(df)
+
+        if not readonly:
+            store.prune(self.snapshot_keep)
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    def _read_sitetracker_chunked(self, st_files, needed, pk_st, keys, shas):
+        """
+        Sitetracker rows whose normalized key is in keys, read in bounded
+        chunks. Every key seen is kept in self._sitetracker_keys for the
+        reconciliation report: {key: label}, where the label is None for
+        keys whose rows are kept (they are labelled from the frame).
+        """
+        store = SnapshotStore(self.snapshot_dir)
+        # Keys in first-seen order, as the in-memory run reads them
+        frames, seen = [], {}
+
+        for path, sha in zip(st_files, shas):
+            if self.snapshot_enabled:
+                chunks = store.batches(store.ensure(path, sha), needed, self.compact_columns)
+            else:
+                chunks = read_sitetracker_file(
+                    path, needed, chunksize=CHUNK_ROWS, arrow_strings=self.compact_columns
+                )
+
+            for chunk in chunks:
+                chunk = self.primary_key.add(DataNormalizer.normalize_columns(chunk), "sitetracker")
+                kept = chunk[pk_st].isin(keys).to_numpy()
+                seen.update(self._new_keys(chunk, kept, seen))
+
+                chunk = chunk[kept]
+                if len(st_files) > 1:
+                    chunk[PROVENANCE_COLUMN] = os.path.basename(path)
+                frames.append(chunk)
+                self.guard.check("load")
+
+        self._sitetracker_keys = seen
+        return pd.concat(frames, ignore_index=True)
+
+    def _new_keys(self, chunk, kept, seen):
+        """
+        (key, label) of each key first seen in chunk. Only keys of rows the
+        chunk drops are labelled here; the rest get None.
+        """
+        key = self.primary_key
+        values = chunk[key.st].to_numpy(dtype=object)
+        rows = np.flatnonzero(~chunk[key.st].duplicated().to_numpy())
+        rows = rows[np.fromiter((values[r] not in seen for r in rows), dtype=bool, count=len(rows))]
+
+        labels = np.full(len(rows), None, dtype=object)
+        dropped = ~kept[rows]
+        labels[dropped] = key.labels(chunk, "sitetracker", rows[dropped])
+        return zip(values[rows], labels)
+
+    def _unmatched_keys(self, valid_src, st_df):
+        """
+        (source keys, Sitetracker keys) to reconcile: the labels of the
+        keys found on one side only, in first-seen order. Keys are matched
+        as the join matches them, so only unmatched ones are labelled.
+        """
+        key = self.primary_key
+        src = valid_src[key.src]
+        st = st_df[key.st]
+        seen = self._sitetracker_keys
+        if seen is None:
+            seen = dict.fromkeys(pd.unique(st))
+
+        src_rows = np.flatnonzero((~src.duplicated() & ~src.isin(list(seen))).to_numpy())
+        src_set = set(src)
+        st_only = [k for k in seen if k not in src_set]
+
+        labels = {k: seen[k] for k in st_only if seen[k] is not None}
+        rows = np.flatnonzero(
+            (~st.duplicated() & st.isin([k for k in st_only if k not in labels])).to_numpy()
+        )
+        labels.update(zip(st.iloc[rows], key.labels(st_df, "sitetracker", rows)))
+
+        return key.labels(valid_src, "source", src_rows), [labels[k] for k in st_only]
+
+    def _choose_strategy(self, source_files, st_files, pk_src, pk_st, field_map):
+        """
+        "in_memory" or "chunked" (Sitetracker streamed and filtered to the
+        source keys), from memory_strategy or, when "auto", from the
+        estimated peak against memory_budget. Fails before anything is
+        read when even the chunked estimate exceeds the budget.
+        """
+        if self.memory_strategy != "auto":
+            return self.memory_strategy
+        if not self.memory_budget:
+            return "in_memory"
+
+        st_needed = None
+        if self.mapped_columns_only:
+            _, st_needed = self._needed_columns(pk_src, pk_st, field_map)
+
+        peak, src_bytes, st_bytes = estimate_peak(
+            source_files, st_files, None, st_needed, self.source_spec.get("sheets")
+        )
+        # Chunked: source in full, Sitetracker bounded by what matches the source
+        chunked_peak = peak - st_bytes + min(st_bytes, src_bytes)
+
+        print(
+            f"[MEMORY] Estimated peak {format_size(peak)} in memory, "
+            f"{format_size(chunked_peak)} chunked; budget {format_size(self.memory_budget)}"
+        )
+
+        if peak <= self.memory_budget * IN_MEMORY_SHARE:
+            return "in_memory"
+        if chunked_peak <= self.memory_budget:
+            return "chunked"
+        raise MemoryBudgetExceeded(
+            f"Estimated peak memory {format_size(chunked_peak)} exceeds the "
+            f"{format_size(self.memory_budget)} memory_budget even when chunked. "
+            "Raise memory_budget or split the source file."
+        )
+
+    def _duplicate_keys(self, valid_src, pk_src):
+        if self.primary_key.composite:
+            # Hashed keys are never blank: key.valid() already rejected blank parts
+            non_empty_pk_df = valid_src
+        else:
+            non_empty_pk_df = valid_src[
+                valid_src[pk_src].notna() &
+                (valid_src[pk_src].str.strip() != "")
+            ]
 
         duplicate_pk_df = non_empty_pk_df[
             non_empty_pk_df.duplicated(subset=[pk_src], keep=False)
         ]
 
-        duplicate_pk_values = sorted(duplicate_pk_df[pk_src].unique())
+        return duplicate_pk_df, sorted(pd.unique(self.primary_key.labels(duplicate_pk_df, "source")))
 
-        if duplicate_pk_values:
-            duplicate_pk_df.to_csv(out("duplicate_primary_keys.csv"), index=False)
+    def _sample_source(self, source_file, needed, sample_rows, method, seed=None):
+        """
+        Returns (sample_df, total_rows). The workbook is opened once in
+        read-only mode and each configured sheet is streamed; head mode stops
+        after sample_rows. total_rows comes from the sheet dimensions in head
+        mode and may be None.
+        """
+        if method not in ("head", "reservoir"):
+            raise Exception(f"Unknown sample method: {method}")
 
-        updates, changes, invalid_dates = [], [], []
+        sheets = self.source_spec.get("sheets") or [{"name": 0, "header": 0}]
+        per_sheet = max(1, sample_rows // len(sheets))
 
-        for _, src in valid_src.iterrows():
-            pr = src[pk_src]
-            if pr not in st_index.index:
-                continue
+        wb = load_workbook(source_file, read_only=True, data_only=True)
+        try:
+            frames, total_rows = [], 0
+            for spec in sheets:
+                name = spec["name"]
+                ws = wb.worksheets[name] if isinstance(name, int) else wb[name]
+                sample, total = self._sample_sheet(
+                    ws, spec.get("header", 0), needed, per_sheet, method, seed
+                )
+                if len(sheets) > 1:
+                    sample[SHEET_COLUMN] = str(name)
+                frames.append(sample)
+                total_rows = None if total is None or total_rows is None else total_rows + total
 
-            st = st_index.loc[pr]
-            if isinstance(st, pd.DataFrame):
-                st = st.iloc[0]
+            return pd.concat(frames, ignore_index=True), total_rows
+        finally:
+            wb.close()
 
-            update = {"Id": st[sf_id_col], pk_src: pr}
-            changed = False
+    @staticmethod
+    def _sample_sheet(ws, header_row, needed, sample_rows, method, seed):
+        rows = ws.iter_rows(min_row=header_row + 1, values_only=True)
+        header = [DataNormalizer.clean_header(h) for h in next(rows, ())]
+        keep = [i for i, h in enumerate(header) if needed is None or h in needed]
 
-            for src_col, st_col, api_col, dtype in field_map:
-                if src_col == pk_src:
-                    continue
-
-                src_val = DataNormalizer.normalize_value(src.get(src_col))
-                st_val = DataNormalizer.normalize_value(st.get(st_col))
-
-                if dtype == "date":
-                    src_fmt, ok = DataNormalizer.normalize_date_uk(src_val)
-                    st_fmt, _ = DataNormalizer.normalize_date_uk(st_val)
-                    if not ok:
-                        invalid_dates.append(f"{pr} | {src_col}: {src_val}")
-                        continue
-                else:
-                    src_fmt, st_fmt = src_val, st_val
-
-                update[api_col] = src_fmt
-
-                if DataNormalizer.comparable_text(src_fmt) != DataNormalizer.comparable_text(st_fmt):
-                    changed = True
-                    changes.append({
-                        "Project Reference": pr,
-                        "Id": st[sf_id_col],
-                        "Source Column": src_col,
-                        "Sitetracker Column": st_col,
-                        "API Field": api_col,
-                        "Old Value": st_val,
-                        "New Value": src_fmt
-                    })
-
-            if changed:
-                updates.append(update)
-
-        pd.DataFrame(updates).to_csv(out("final_input_file.csv"), index=False)
-        pd.DataFrame(changes).to_csv(out("field_level_changes.csv"), index=False)
-
-        with open(out("run_summary.txt"), "w", encoding="utf-8") as f:
+        rng = random.Random(seed)
+        sample, total = [], 0
+        for row in rows:
+            total += 1
+            values = [None if i >= len(row) or row[i] is None else str(row[i]) for i in keep]
+            if len(sample) < sample_rows:
+                sample.append(values)
+            elif method == "head":
+                total = ws.max_row - header_row - 1 if ws.max_row else None
+                break
+            else:
+                j = rng.randrange(total)
+                if j < sample_rows:
+                    sample[j] = values
+
+        return pd.DataFrame(sample, columns=[header[i] for i in keep], dtype=object), total
+
+    def preview(self, sample_rows=500, method="head", seed=None):
+        """
+        Estimate delta size from a bounded sample of source rows.
+        Reads inputs only: nothing is written, moved or archived.
+        """
+        st_df = None
+        if self.mirror_cfg.get("enabled", False):
+            source_files = self._input_files(self.source_dir, "Source", self.source_spec)
+            st_files, st_df = [], self._mirror_frame()
+        else:
+            source_files, st_files = self._collect_inputs()
+
+        pk_src, pk_st, field_map = self._load_mapping()
+        src_needed = None
+        if self.mapped_columns_only:
+            src_needed, _ = self._needed_columns(pk_src, pk_st, field_map)
+
+        # The sample is split evenly across source files
+        per_file = max(1, sample_rows // len(source_files))
+        samples, total_rows = [], 0
+        for source_file in source_files:
+            sample, total = self._sample_source(source_file, src_needed, per_file, method, seed)
+            if len(source_files) > 1:
+                sample[PROVENANCE_COLUMN] = os.path.basename(source_file)
+            samples.append(sample)
+            total_rows = None if total is None or total_rows is None else total_rows + total
+
+        sample_df = pd.concat(samples, ignore_index=True)
+
+        sample_keys = set(
+            self.primary_key.values(DataNormalizer.normalize_columns(sample_df), "source")
+        )
+
+        src_df, st_df, sf_id_col = self._load_inputs(
+            source_files, st_files, pk_src, pk_st, field_map,
+            src_df=sample_df, st_keys=sample_keys, readonly=True, st_df=st_df
+        )
+        valid_src = src_df[src_df["VALID"]]
+        updates_df, changes_df, invalid_dates = diff_frames(
+            valid_src, st_df, pk_src, pk_st, sf_id_col, self._diff_fields(field_map),
+            label_cols=self._label_columns()
+        )
+
+        sampled = len(src_df)
+        scale = total_rows / sampled if sampled and total_rows else 1.0
+
+        field_changes = (
+            changes_df["API Field"].value_counts().to_dict() if len(changes_df) else {}
+        )
+
+        return {
+            "report": self.report_name,
+            "sample_method": method,
+            "sampled_rows": sampled,
+            "total_source_rows": total_rows,
+            "sample_valid_records": len(valid_src),
+            "sample_delta_records": len(updates_df),
+            "sample_invalid_dates": len(invalid_dates),
+            "estimated_delta_records": round(len(updates_df) * scale),
+            "estimated_fields_updated": round(len(changes_df) * scale),
+            "field_changes": {
+                api: {"sample": int(n), "estimated": round(n * scale)}
+                for api, n in sorted(field_changes.items())
+            }
+        }
+
+    def _write_patches(self, updates_df, changes_df, out):
+        """
+        changed_only output: Id plus the changed fields of each update,
+        one file per changed-column set (at most patch_batch_size records
+        each), listed in final_input_patches.csv.
+        """
+        index = []
+        for n, batch in enumerate(patch_batches(updates_df, changes_df, self.patch_batch_size), 1):
+            name = PATCH_FILE.format(n)
+            batch.to_csv(out(name), index=False)
+            index.append({
+                "Batch": n,
+                "File": name,
+                "Records": len(batch),
+                "Fields": "; ".join(batch.columns[1:])
+            })
+
+        index = pd.DataFrame(index, columns=PATCH_INDEX_COLUMNS)
+        index.to_csv(out(PATCH_INDEX_FILE), index=False)
+        return index
+
+    def _write_summary(self, path, run_day, run_time, counts, pk_src, pk_st,
+                       field_map, duplicate_pk_values, duplicate_records, invalid_dates,
+                       unmatched_df=None, patch_index=None):
+        with open(path, "w", encoding="utf-8") as f:
             f.write(f"Report Name: {self.report_name}\n")
             f.write(f"Run time: {run_day} {run_time}\n\n")
 
             f.write("==== COUNTS ====\n")
-            f.write(f"Valid source records: {len(valid_src)}\n")
-            f.write(f"Delta Records: {len(updates)}\n")
-            f.write(f"Fields updated: {len(changes)}\n\n")
+            f.write(f"Valid source records: {counts['valid_records']}\n")
+            f.write(f"Delta Records: {counts['delta_records']}\n")
+            f.write(f"Fields updated: {counts['fields_updated']}\n\n")
 
             f.write("==== PRIMARY KEY ====\n")
             f.write(f"Source: {pk_src}\n")
@@ -183,6 +714,7 @@ class InputFileEngine:
 
             f.write("\n==== DUPLICATE PRIMARY KEYS (SOURCE) ====\n")
             f.write(f"Duplicate keys found: {len(duplicate_pk_values)}\n")
+            f.write(f"Total duplicate records: {duplicate_records}\n")
             for v in duplicate_pk_values:
                 f.write(f"- {v}\n")
 
@@ -192,13 +724,331 @@ class InputFileEngine:
                 for line in invalid_dates:
                     f.write(line + "\n")
 
-        if self.yaml_cfg.get("behavior", {}).get("archive_after_success", True):
-            archive = os.path.join(self.archive_dir, run_day, run_time)
-            os.makedirs(archive, exist_ok=True)
-            shutil.move(source_file, archive)
-            shutil.move(st_file, archive)
+            if unmatched_df is not None:
+                f.write("\n==== UNMATCHED KEYS ====\n")
+                sides = unmatched_df["Side"].value_counts()
+                f.write(f"Source only: {sides.get(SOURCE_ONLY, 0)}\n")
+                f.write(f"Sitetracker only: {sides.get(SITETRACKER_ONLY, 0)}\n")
+                f.write(f"With a suggested match: {(unmatched_df['Best Match'] != '').sum()}\n")
+
+            if patch_index is not None:
+                f.write("\n==== PATCH BATCHES (CHANGED FIELDS ONLY) ====\n")
+                f.write(f"Batches: {len(patch_index)}\n")
+                for _, b in patch_index.iterrows():
+                    f.write(f"- {b['File']}: {b['Records']} records | {b['Fields']}\n")
+
+    def _write_workbook(self, path, run_day, run_time, counts, stages, updates_df,
+                        changes_df, patch_index=None):
+        """
+        Business-facing copy of the run: a Summary sheet of the run
+        metrics, then the upload rows (or the patch batch index in
+        changed_only mode) and the field-level changes.
+        """
+        key = self.primary_key
+        summary = [
+            ("Run", "Report Name", self.report_name),
+            ("Run", "Run time", f"{run_day} {run_time}"),
+            ("Run", "Output mode", self.output_mode),
+            ("Primary Key", "Source", key.src),
+            ("Primary Key", "Sitetracker", key.st),
+        ]
+        summary += [("Counts", name, int(value)) for name, value in counts.items()]
+        summary += [
+            ("Stage seconds", stage, round(seconds, 3))
+            for stage, seconds in stages.items()
+        ]
+        summary.append(("Memory", "Peak RSS so far", format_size(self.guard.peak)))
+
+        if patch_index is None:
+            frames = [("final_input_file", updates_df)]
+        else:
+            frames = [("patch_batches", patch_index)]
+        frames.append(("field_level_changes", changes_df))
+
+        write_xlsx(path, frames, summary)
+
+    @staticmethod
+    def _describe_inputs(files):
+        return [
+            {
+                "role": role,
+                "file_name": os.path.basename(path),
+                "sha256": file_sha256(path),
+                "size_bytes": os.path.getsize(path)
+            }
+            for role, path in files
+        ]
+
+    def _fingerprint(self, inputs, mapping):
+        """
+        Identity of everything that determines a run's outputs: input file
+        contents, this report's mapping rows, the report config and the
+        engine code.
+        """
+        payload = json.dumps(
+            {
+                "inputs": sorted((i["role"], i["sha256"]) for i in inputs),
+                "engine": engine_code_hash(),
+                "mapping": mapping.fingerprint(),
+                # Profiling does not change what a run produces
+                "config": {k: v for k, v in self.yaml_cfg.items() if k != "profile"}
+            },
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _link(src, dst):
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    def _stage_started(self, stage, total=None):
+        self.guard.check(stage)
+        self.progress.stage_started(stage, total)
+        return time.perf_counter()
+
+    def _stage_finished(self, stages, stage, stage_start, rows=None):
+        stages[stage] = time.perf_counter() - stage_start
+        self.guard.check(stage)
+        self.progress.stage_finished(stage, rows)
+
+    def _advance(self, stage, rows, total=None):
+        self.guard.check(stage, sample=False)
+        self.progress.advance(stage, rows, total)
+
+    def _process(self, mapping, source_files, st_files, st_shas, run_day, run_time, out, stages):
+        pk_src, pk_st, field_map = self._load_mapping(mapping)
+        strategy = self._choose_strategy(source_files, st_files, pk_src, pk_st, field_map)
+
+        stage_start = self._stage_started("load")
+        src_df, st_df, sf_id_col = self._load_inputs(
+            source_files, st_files, pk_src, pk_st, field_map,
+            chunked=strategy == "chunked", st_shas=st_shas
+        )
+        self._stage_finished(stages, "load", stage_start, len(src_df))
+
+        valid = src_df["VALID"].to_numpy()
+        invalid_src = src_df[~valid]
+        self._with_key_labels(invalid_src).to_csv(out("invalid_primary_key.csv"), index=False)
+
+        valid_src = self._diff_frame(src_df, field_map)[valid]
+
+        duplicate_pk_df, duplicate_pk_values = self._duplicate_keys(valid_src, pk_src)
+
+        if duplicate_pk_values:
+            # Written with the full source rows
+            self._with_key_labels(src_df.loc[duplicate_pk_df.index]).to_csv(
+                out("duplicate_primary_keys.csv"), index=False
+            )
+
+        stage_start = self._stage_started("diff", len(valid_src))
+        updates_df, changes_df, invalid_dates = parallel_diff_frames(
+            valid_src, st_df, pk_src, pk_st, sf_id_col, self._diff_fields(field_map),
+            shards=self.diff_shards, max_workers=self.diff_workers,
+            progress=lambda rows: self._advance("diff", rows),
+            label_cols=self._label_columns()
+        )
+        self._stage_finished(stages, "diff", stage_start)
+
+        unmatched_df = None
+        if self.reconcile.get("enabled", True):
+            stage_start = self._stage_started("reconcile")
+            src_keys, st_keys = self._unmatched_keys(valid_src, st_df)
+            unmatched_df = reconcile_keys(
+                src_keys, st_keys,
+                limit=self.reconcile.get("suggestions", 3),
+                min_similarity=self.reconcile.get("min_similarity", 0.65),
+                progress=lambda done, total: self._advance("reconcile", done, total)
+            )
+            unmatched_df.to_csv(out("unmatched_keys.csv"), index=False)
+            self._stage_finished(stages, "reconcile", stage_start, len(unmatched_df))
+
+        counts = {
+            "valid_records": len(valid_src),
+            "delta_records": len(updates_df),
+            "fields_updated": len(changes_df),
+            "duplicate_keys": len(duplicate_pk_values),
+            "invalid_keys": len(invalid_src),
+            "invalid_dates": len(invalid_dates)
+        }
+
+        stage_start = self._stage_started("write")
+        patch_index = None
+        if self.output_mode == "changed_only":
+            patch_index = self._write_patches(updates_df, changes_df, out)
+        else:
+            updates_df.to_csv(out("final_input_file.csv"), index=False)
+        changes_df.to_csv(out("field_level_changes.csv"), index=False)
+
+        self._write_summary(
+            out("run_summary.txt"), run_day, run_time, counts, pk_src, pk_st,
+            field_map, duplicate_pk_values, len(duplicate_pk_df), invalid_dates,
+            unmatched_df, patch_index
+        )
+        self._stage_finished(stages, "write", stage_start)
+
+        if self.write_xlsx:
+            stage_start = self._stage_started("xlsx")
+            self._write_workbook(
+                out(XLSX_FILE), run_day, run_time, counts, stages,
+                updates_df, changes_df, patch_index
+            )
+            self._stage_finished(stages, "xlsx", stage_start)
+
+        stage_start = self._stage_started("change_log")
+        self._append_change_log(run_day, run_time, changes_df)
+        self._stage_finished(stages, "change_log", stage_start)
+
+        return counts
+
+    def run(self, force=False):
+        """
+        force: process the inputs even if an earlier successful run saw
+        exactly the same inputs, mapping and config.
+
+        With profiling on (profile.enabled, or --profile) the run is
+        profiled and the profile files land in its run folder.
+        """
+        if not self.profile_enabled:
+            return self._run(force)
+
+        profiler = RunProfiler(self.profile_interval, self.profile_top)
+        try:
+            with profiler:
+                return self._run(force)
+        finally:
+            # Failed runs keep their profile too; skipped runs have no folder
+            if self.run_dir and os.path.isdir(self.run_dir):
+                profiler.save(self.run_dir)
+                print(f"[PROFILE] Profile written to {self.run_dir}")
+
+    def _run(self, force):
+        print("ENGINE STARTED")
+        source_files, st_files = self._collect_inputs()
+
+        started = datetime.now()
+        run_day = started.strftime("%Y-%m-%d")
+        run_time = started.strftime("run_%H-%M-%S")
+        run_dir = os.path.join(self.runs_dir, run_day, run_time)
+        os.makedirs(run_dir, exist_ok=True)
+        self.run_dir = run_dir
+
+        def out(name):
+            path = os.path.join(run_dir, name)
+            outputs[name] = path
+            return path
+
+        outputs, stages = {}, {}
+        record = {
+            "report_name": self.report_name,
+            "run_day": run_day,
+            "run_time": run_time,
+            "started_at": started.isoformat(timespec="seconds"),
+            "run_dir": run_dir,
+            "stages": stages,
+            "outputs": outputs
+        }
+
+        self.guard = MemoryGuard(self.memory_budget).start()
+        try:
+            stage_start = self._stage_started("hash_inputs")
+            record["inputs"] = self._describe_inputs(
+                [("source", f) for f in source_files] +
+                [("sitetracker", f) for f in st_files]
+            )
+            mapping = self._mapping()
+            record["fingerprint"] = self._fingerprint(record["inputs"], mapping)
+            self._stage_finished(stages, "hash_inputs", stage_start)
+
+            previous = None
+            if self.skip_unchanged_inputs and not force:
+                previous = RunHistory(self.history_db).last_run_with_fingerprint(
+                    self.report_name, record["fingerprint"]
+                )
+
+            if previous and all(os.path.exists(p) for p in previous["outputs"].values()):
+                stage_start = self._stage_started("reuse")
+                for name, path in previous["outputs"].items():
+                    self._link(path, out(name))
+                record.update({c: previous[c] for c in COUNT_COLUMNS})
+                record["status"] = "noop"
+                self._stage_finished(stages, "reuse", stage_start)
+                print(f"[NO-OP] Inputs unchanged since {previous['run_dir']}; outputs re-linked")
+            else:
+                st_shas = [i["sha256"] for i in record["inputs"] if i["role"] == "sitetracker"]
+                record.update(self._process(
+                    mapping, source_files, st_files, st_shas, run_day, run_time, out, stages
+                ))
+                record["status"] = "success"
+
+            if self.yaml_cfg.get("behavior", {}).get("archive_after_success", True):
+                stage_start = self._stage_started("archive")
+                ArchiveStore(self.archive_dir, self.archive_compression).store_run(
+                    run_day, run_time,
+                    [
+                        (i["role"], path, i["sha256"])
+                        for path, i in zip(source_files + st_files, record["inputs"])
+                    ]
+                )
+                self._stage_finished(stages, "archive", stage_start)
+
+            stage_start = self._stage_started("retention")
+            self._apply_retention()
+            self._stage_finished(stages, "retention", stage_start)
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = f"{type(e).__name__}: {e}"
+            if isinstance(e, MemoryBudgetExceeded):
+                # Never leave a half-written run folder behind
+                shutil.rmtree(run_dir, ignore_errors=True)
+                outputs.clear()
+            raise
+        finally:
+            self.guard.stop()
+            budget = f" of {format_size(self.memory_budget)} budget" if self.memory_budget else ""
+            print(f"[MEMORY] Peak RSS {format_size(self.guard.peak)}{budget}")
+            finished = datetime.now()
+            record["finished_at"] = finished.isoformat(timespec="seconds")
+            record["duration_seconds"] = (finished - started).total_seconds()
+            self._record_history(record)
 
         print(f"SUCCESS. Output written to {run_dir}")
+        return run_dir
+
+    def _apply_retention(self):
+        max_age_days = self.retention.get("max_age_days")
+        max_runs = self.retention.get("max_runs")
+        if max_age_days is None and max_runs is None:
+            return
+
+        pruned_runs = prune_runs(self.runs_dir, max_age_days, max_runs)
+        pruned_archives = prune_runs(self.archive_dir, max_age_days, max_runs)
+        removed_objects = ArchiveStore(self.archive_dir, self.archive_compression).collect_garbage()
+
+        if pruned_runs or pruned_archives or removed_objects:
+            print(
+                f"[RETENTION] Removed {len(pruned_runs)} run folders, "
+                f"{len(pruned_archives)} archive folders, {removed_objects} archived files"
+            )
+
+    def _append_change_log(self, run_day, run_time, changes_df):
+        try:
+            ChangeLogStore(self.change_log_dir).append(
+                self.report_name, run_day, run_time, changes_df
+            )
+        except (OSError, pa.ArrowException) as e:
+            print(f"[WARN] Could not append to change log: {e}")
+
+    def _record_history(self, record):
+        try:
+            RunHistory(self.history_db).record_run(record)
+        except sqlite3.Error as e:
+            # History is bookkeeping only; never fail a run because of it
+            print(f"[WARN] Could not record run history: {e}")
+
     # =====================================================
 # CLI ENTRY POINT
 # =====================================================
@@ -211,4 +1061,7 @@ if __name__ == "__main__":
     report_name = sys.argv[2]
 
     engine = InputFileEngine(report_name)
-    engine.run()
\ No newline at end of file
+    try:
+        engine.run()
+    except SkipRun as e:
+        print(f"[SKIP] {e}")
\ No newline at end of file
@@ -1,5 +1,7 @@
 # engine/mapping_loader.py
 
+import hashlib
+
 import pandas as pd
 
 
@@ -21,17 +23,22 @@ class MappingLoader:
         return df
 
     def primary_keys(self):
-        pk_row = self.mapping_df[
-            self.mapping_df["Primary Key?"].str.upper() == "YES"
+        """
+        (source column, Sitetracker field) of every row flagged
+        Primary Key? = YES, in mapping order. Several rows make a
+        composite key.
+        """
+        pk_rows = self.mapping_df[
+            self.mapping_df["Primary Key?"].str.strip().str.upper() == "YES"
         ]
 
-        if pk_row.empty:
+        if pk_rows.empty:
             raise Exception("Primary key not defined in mapping file")
 
-        return (
-            pk_row.iloc[0]["Source File Column Name"],
-            pk_row.iloc[0]["Sitetracker Field Name"]
-        )
+        return [
+            (r["Source File Column Name"], r["Sitetracker Field Name"])
+            for _, r in pk_rows.iterrows()
+        ]
 
     def field_mapping(self):
         return [
@@ -42,4 +49,10 @@ class MappingLoader:
                 str(r["Data Type"]).lower()
             )
             for _, r in self.mapping_df.iterrows()
-        ]
\ No newline at end of file
+        ]
+
+    def fingerprint(self):
+        # Hash of this report's mapping rows, in file order
+        return hashlib.sha256(
+            self.mapping_df.to_csv(index=False).encode("utf-8")
+        ).hexdigest()
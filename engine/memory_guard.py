@@ -0,0 +1,163 @@
+# engine/memory_guard.py
+
+import os
+import re
+import resource
+import threading
+
+from openpyxl import load_workbook
+
+from engine.normalizer import DataNormalizer
+
+# Rough in-memory cost of one parsed string cell (object pointer + str)
+BYTES_PER_CELL = 72
+# Working copies made while normalizing and diffing, relative to the loaded frames
+PEAK_FACTOR = 2.0
+# Share of the budget the in-memory strategy may plan to use
+IN_MEMORY_SHARE = 0.7
+# Fail once RSS crosses this share of the budget, before actually going over it
+HEADROOM = 0.9
+
+_UNITS = {"": 1, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+
+def parse_size(value):
+    """
+    Bytes from 2147483648, "2GB", "512 MB", "1.5G" (binary units). None stays None.
+    """
+    if value is None or isinstance(value, (int, float)):
+        return None if value is None else int(value)
+
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?)I?B?\s*", str(value).upper())
+    if not match:
+        raise Exception(f"Invalid memory size: {value}")
+    return int(float(match.group(1)) * _UNITS[match.group(2)])
+
+
+def format_size(n):
+    return f"{n / 1024 ** 2:,.0f} MB"
+
+
+def current_rss():
+    """
+    Resident set size of this process in bytes. Worker processes of the
+    read/diff pools are not included.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is the peak, in KB on Linux; the best available elsewhere
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _csv_cells(path, needed, sample_bytes=256 * 1024):
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(sample_bytes)
+
+    lines = head.splitlines()
+    if not lines:
+        return 0
+    header = lines[0].decode("latin1").split(",")
+    columns = len(header) if needed is None else sum(
+        DataNormalizer.clean_header(h.strip('"')) in needed for h in header
+    )
+    rows = size / (len(head) / len(lines)) if len(lines) > 1 else 1
+    return int(rows * max(columns, 1))
+
+
+def _xlsx_cells(path, needed, sheets=None):
+    sheets = sheets or [{"name": 0, "header": 0}]
+    wb = load_workbook(path, read_only=True)
+    try:
+        cells = 0
+        for spec in sheets:
+            name = spec["name"]
+            ws = wb.worksheets[name] if isinstance(name, int) else wb[name]
+            rows, columns = ws.max_row, ws.max_column
+            if not rows or not columns:
+                # No <dimension> in the sheet: assume ~10 bytes of zip per cell
+                return os.path.getsize(path) // 10
+            if needed is not None:
+                columns = min(columns, len(needed))
+            cells += rows * columns
+        return cells
+    finally:
+        wb.close()
+
+
+def estimate_peak(source_files, st_files, src_needed=None, st_needed=None, sheets=None):
+    """
+    Estimated peak bytes for loading and diffing everything in memory,
+    from row/column counts (sheet dimensions, CSV line length) rather
+    than by reading the data. Returns (total, source_part, sitetracker_part).
+    """
+    src_cells = sum(_xlsx_cells(p, src_needed, sheets) for p in source_files)
+    st_cells = sum(_csv_cells(p, st_needed) for p in st_files)
+
+    src_bytes = src_cells * BYTES_PER_CELL * PEAK_FACTOR
+    st_bytes = st_cells * BYTES_PER_CELL * PEAK_FACTOR
+    return int(current_rss() + src_bytes + st_bytes), int(src_bytes), int(st_bytes)
+
+
+class MemoryGuard:
+    """
+    Samples RSS on a background thread and records the peak. The engine
+    calls check() at stage boundaries and from its progress hooks;
+    check() raises MemoryBudgetExceeded once RSS has crossed the
+    headroom share of the budget, so a run stops with a clear message
+    instead of being OOM-killed mid-write.
+    """
+
+    def __init__(self, budget=None, interval=0.2):
+        self.budget = budget
+        self.limit = int(budget * HEADROOM) if budget else None
+        self.interval = interval
+        self.peak = current_rss()
+        self.tripped_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss()
+        self.peak = max(self.peak, rss)
+        if self.limit and rss > self.limit and self.tripped_at is None:
+            self.tripped_at = rss
+        return rss
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="memory-guard", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._sample()
+
+    def check(self, stage="", sample=True):
+        """
+        sample=False only looks at what the background thread saw, for
+        calls from hot loops.
+        """
+        rss = self._sample() if sample else self.peak
+        if self.tripped_at is not None:
+            where = f" during {stage}" if stage else ""
+            raise MemoryBudgetExceeded(
+                f"Memory use reached {format_size(max(rss, self.tripped_at))}{where}, over "
+                f"{HEADROOM:.0%} of the {format_size(self.budget)} memory_budget. "
+                "Raise memory_budget or reduce the input size."
+            )
@@ -1,5 +1,6 @@
 # engine/normalizer.py
 
+import numpy as np
 import pandas as pd
 import re
 from datetime import datetime
@@ -16,6 +17,73 @@ class DataNormalizer:
         )
         return df
 
+    @staticmethod
+    def clean_header(name):
+        # Same cleanup as normalize_columns, for a single header cell
+        return str(name).replace("\ufeff", "").replace("\u00a0", "").strip()
+
+    @staticmethod
+    def compact_frame(df, max_unique_ratio=0.5):
+        """
+        Convert object columns to categorical (low cardinality) or
+        Arrow-backed strings (high cardinality), chosen per column.
+        """
+        for col in df.columns:
+            s = df[col]
+            if len(s) and s.nunique(dropna=True) / len(s) <= max_unique_ratio:
+                df[col] = s.astype("category")
+            else:
+                df[col] = s.astype("string[pyarrow]")
+        return df
+
+    @staticmethod
+    def map_column(series, func):
+        """
+        Apply a cell-level normalizer to a column.
+        Categorical columns are mapped once per category instead of per cell.
+        """
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            out = series.map(func)
+            if isinstance(series.dtype, pd.StringDtype) and \
+                    pd.api.types.infer_dtype(out, skipna=False) == "string":
+                out = out.astype(series.dtype)
+            return out
+
+        lookup = [func(v) for v in series.cat.categories] + [func(np.nan)]
+        codes = series.cat.codes.to_numpy()
+
+        if all(isinstance(v, str) for v in lookup):
+            new_codes, categories = pd.factorize(pd.Series(lookup, dtype=object))
+            return pd.Series(
+                pd.Categorical.from_codes(new_codes[codes], categories),
+                index=series.index,
+                name=series.name
+            )
+
+        values = np.empty(len(lookup), dtype=object)
+        values[:] = lookup
+        return pd.Series(values[codes], index=series.index, name=series.name)
+
+    @staticmethod
+    def composite_key(parts):
+        """
+        One uint64 per row for a list of normalized key columns, hashed
+        column-at-a-time; equal parts give the same key on either side.
+        """
+        frame = pd.DataFrame(
+            {i: np.asarray(part.astype(object), dtype=object) for i, part in enumerate(parts)}
+        )
+        return pd.Series(
+            pd.util.hash_pandas_object(frame, index=False).to_numpy(),
+            index=parts[0].index
+        )
+
+    @staticmethod
+    def column_matches(series, pattern):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = pd.Series(series.cat.categories, dtype=object)
+        return series.dropna().astype(str).str.match(pattern).any()
+
     @staticmethod
     def normalize_value(v):
         if pd.isna(v):
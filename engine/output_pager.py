@@ -0,0 +1,106 @@
+# engine/output_pager.py
+
+import csv
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+VIEWER_DIR = ".viewer"
+
+
+class OutputPager:
+    """
+    Paged, filterable access to a run's CSV output.
+
+    On first use the CSV is streamed once into an Arrow IPC sidecar file
+    (<run_dir>/.viewer/<name>.arrow, all columns as strings). Pages are
+    then served from a memory map of that file, so only the rows on the
+    requested page are ever converted to pandas.
+    """
+
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        run_dir, name = os.path.split(csv_path)
+        self.arrow_path = os.path.join(run_dir, VIEWER_DIR, os.path.splitext(name)[0] + ".arrow")
+        self._table = None
+        self._last_filter = (None, None)
+
+    def _header(self):
+        with open(self.csv_path, "r", encoding="utf-8", newline="") as f:
+            return next(csv.reader(f), [])
+
+    def _build_snapshot(self):
+        os.makedirs(os.path.dirname(self.arrow_path), exist_ok=True)
+        header = self._header()
+        schema = pa.schema([(c, pa.string()) for c in header])
+        tmp = self.arrow_path + ".tmp"
+
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            if header:
+                reader = pacsv.open_csv(
+                    self.csv_path,
+                    convert_options=pacsv.ConvertOptions(
+                        column_types=schema, strings_can_be_null=False
+                    )
+                )
+                for batch in reader:
+                    writer.write_batch(batch)
+
+        os.replace(tmp, self.arrow_path)
+
+    def table(self) -> pa.Table:
+        if self._table is None:
+            stale = (
+                not os.path.exists(self.arrow_path)
+                or os.path.getmtime(self.arrow_path) < os.path.getmtime(self.csv_path)
+            )
+            if stale:
+                self._build_snapshot()
+            # Zero-copy: columns stay backed by the memory-mapped file
+            self._table = pa.ipc.open_file(pa.memory_map(self.arrow_path, "r")).read_all()
+        return self._table
+
+    @property
+    def columns(self):
+        return self.table().column_names
+
+    @property
+    def num_rows(self):
+        return self.table().num_rows
+
+    def filtered(self, filters=None, contains=False) -> pa.Table:
+        """
+        filters: {column: value}; rows must match every non-empty value,
+        exactly or (contains=True) as a case-insensitive substring.
+        """
+        key = (tuple(sorted((filters or {}).items())), contains)
+        if self._last_filter[0] == key:
+            # Paging through one filter result reuses it
+            return self._last_filter[1]
+
+        table = self.table()
+        mask = None
+
+        for column, value in (filters or {}).items():
+            if not value or column not in table.column_names:
+                continue
+            if contains:
+                cond = pc.match_substring(table[column], value, ignore_case=True)
+            else:
+                cond = pc.equal(table[column], value)
+            mask = cond if mask is None else pc.and_(mask, cond)
+
+        result = table if mask is None else table.filter(mask)
+        self._last_filter = (key, result)
+        return result
+
+    def page(self, page: int, page_size: int = 100, filters=None, contains=False):
+        """
+        Returns (page_df, matching_rows). page is 0-based.
+        """
+        table = self.filtered(filters, contains)
+        start = min(max(0, page) * page_size, table.num_rows)
+        length = min(page_size, table.num_rows - start)
+        return table.slice(start, length).to_pandas(), table.num_rows
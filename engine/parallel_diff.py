@@ -0,0 +1,118 @@
+# engine/parallel_diff.py
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from engine.differ import diff_frames, diff_rows, merge_diffs
+
+ROW_COLUMN = "__row__"
+
+
+def _shard_ids(keys, shards):
+    """
+    Shard number of each key: a stable hash of its text, so equal keys on
+    the source and Sitetracker side always land in the same shard.
+    """
+    text = np.asarray(keys.astype(object).astype(str), dtype=object)
+    return (pd.util.hash_array(text) % np.uint64(shards)).astype(np.int64)
+
+
+def _to_ipc(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _shard_ipc(df, rows):
+    return _to_ipc(pa.Table.from_pandas(df.iloc[rows], preserve_index=False))
+
+
+def _from_ipc(buffer):
+    df = pa.ipc.open_stream(buffer).read_all().to_pandas()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            # The Arrow dictionary is the full column's; normalize only this shard's values
+            df[col] = df[col].cat.remove_unused_categories()
+    return df
+
+
+def _diff_shard(src_buf, st_buf, pk_src, pk_st, sf_id_col, field_map, label_cols=None):
+    src = _from_ipc(src_buf)
+    st = _from_ipc(st_buf)
+    row_ids = src.pop(ROW_COLUMN).to_numpy()
+    return diff_rows(
+        src, st, pk_src, pk_st, sf_id_col, field_map, row_ids=row_ids, label_cols=label_cols
+    )
+
+
+def parallel_diff_frames(valid_src, st_df, pk_src, pk_st, sf_id_col, field_map,
+                         shards=4, max_workers=4, progress=None, label_cols=None):
+    """
+    diff_frames() over key-hashed shards in a process pool.
+
+    Both sides are partitioned by primary key, so each shard is a
+    self-contained diff. Shards travel to the workers as Arrow IPC
+    buffers, built one shard at a time as workers free up, and the pieces
+    are merged by source row, giving output identical to diff_frames().
+    progress is called with the number of source rows diffed so far.
+    """
+    if shards <= 1:
+        return diff_frames(
+            valid_src, st_df, pk_src, pk_st, sf_id_col, field_map, progress, label_cols
+        )
+
+    src_cols = [pk_src] + [
+        c for c in dict.fromkeys([*(label_cols or []), *(src for src, _, _, _ in field_map)])
+        if c != pk_src and c in valid_src.columns
+    ]
+    st_cols = [pk_st] + [
+        c for c in dict.fromkeys([sf_id_col] + [st for _, st, _, _ in field_map])
+        if c != pk_st and c in st_df.columns
+    ]
+
+    src = valid_src[src_cols].reset_index(drop=True)
+    src[ROW_COLUMN] = np.arange(len(src))
+    # Only the first Sitetracker row per key is ever compared
+    st = st_df[st_cols].drop_duplicates(subset=[pk_st], keep="first").reset_index(drop=True)
+
+    src_shard = _shard_ids(src[pk_src], shards)
+    st_shard = _shard_ids(st[pk_st], shards)
+    src_rows = [np.flatnonzero(src_shard == i) for i in range(shards)]
+    st_rows = [np.flatnonzero(st_shard == i) for i in range(shards)]
+
+    workers = min(max_workers, shards)
+    parts, done = [None] * shards, 0
+    queued = iter(range(shards))
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def submit_next():
+            # A shard's IPC buffers are built only when a worker is free for
+            # it, so at most `workers` shard copies exist at any time
+            i = next(queued, None)
+            if i is not None:
+                running[pool.submit(
+                    _diff_shard,
+                    _shard_ipc(src, src_rows[i]),
+                    _shard_ipc(st, st_rows[i]),
+                    pk_src, pk_st, sf_id_col, field_map, label_cols
+                )] = i
+
+        for _ in range(workers):
+            submit_next()
+
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = running.pop(future)
+                parts[i] = future.result()
+                done += len(src_rows[i])
+                if progress is not None:
+                    progress(done)
+                submit_next()
+
+    return merge_diffs(parts, pk_src, field_map)
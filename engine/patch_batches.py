@@ -0,0 +1,53 @@
+# engine/patch_batches.py
+
+import numpy as np
+import pandas as pd
+
+PATCH_FILE = "final_input_patch_{:03d}.csv"
+PATCH_INDEX_FILE = "final_input_patches.csv"
+PATCH_INDEX_COLUMNS = ["Batch", "File", "Records", "Fields"]
+
+
+def changed_columns(updates_df, changes_df):
+    """
+    Boolean matrix (update rows x API columns of updates_df) of the fields
+    that actually changed on each update record, and those columns.
+    """
+    columns = [c for c in updates_df.columns if c in set(changes_df["API Field"])]
+    changed = changes_df[["Id", "API Field"]].drop_duplicates()
+
+    ids = pd.Index(pd.unique(changed["Id"]))
+    matrix = np.zeros((len(ids), len(columns)), dtype=bool)
+    col_pos = pd.Index(columns).get_indexer(changed["API Field"])
+    keep = col_pos >= 0
+    matrix[ids.get_indexer(changed["Id"])[keep], col_pos[keep]] = True
+
+    rows = ids.get_indexer(updates_df["Id"])
+    mask = np.zeros((len(updates_df), len(columns)), dtype=bool)
+    mask[rows >= 0] = matrix[rows[rows >= 0]]
+    return mask, columns
+
+
+def patch_batches(updates_df, changes_df, batch_size=10_000):
+    """
+    Id plus only the changed fields of every update record, grouped by
+    identical changed-column sets: one dense frame per set (split into
+    batch_size records), sets in order of their first record.
+    """
+    if updates_df.empty or changes_df.empty:
+        return []
+
+    mask, columns = changed_columns(updates_df, changes_df)
+    signatures, first, group = np.unique(mask, axis=0, return_index=True, return_inverse=True)
+    group = group.reshape(-1)
+
+    batches = []
+    for g in np.argsort(first, kind="stable"):
+        fields = [c for c, on in zip(columns, signatures[g]) if on]
+        if not fields:
+            continue
+        rows = np.flatnonzero(group == g)
+        for start in range(0, len(rows), batch_size):
+            part = rows[start:start + batch_size]
+            batches.append(updates_df.iloc[part][["Id", *fields]].reset_index(drop=True))
+    return batches
@@ -0,0 +1,94 @@
+# engine/primary_key.py
+
+import numpy as np
+import pandas as pd
+
+from engine.normalizer import DataNormalizer
+
+LABEL_SEPARATOR = " | "
+
+
+def key_labels(df, columns, rows=None):
+    """
+    "PX1 | Site A" labels of df's rows at positions rows (all when None),
+    from the normalized values of the key part columns.
+    """
+    if rows is not None:
+        df = df.iloc[rows]
+    parts = [
+        DataNormalizer.map_column(df[c], DataNormalizer.normalize_value).astype(object)
+        for c in columns
+    ]
+    return pd.Series(parts[0], dtype=object).str.cat(parts[1:], sep=LABEL_SEPARATOR).to_numpy()
+
+
+class PrimaryKey:
+    """
+    A report's primary key: the mapping rows flagged Primary Key? = YES.
+
+    With one row the key column is the normalized source/Sitetracker
+    column itself, as it has always been. With several (composite key)
+    each side gets one compact uint64 column, named after its parts
+    ("Project Ref + Site"), hashed from the normalized part values, so
+    the join, duplicate detection and key filtering compare a single
+    integer per row. The readable "PX1 | Site A" form is built by
+    labels() only for the rows that reach an output file.
+    """
+
+    def __init__(self, parts):
+        self.parts = list(parts)
+        self.src_columns = [src for src, _ in self.parts]
+        self.st_columns = [st for _, st in self.parts]
+        self.composite = len(self.parts) > 1
+
+        self.src = " + ".join(self.src_columns)
+        self.st = " + ".join(self.st_columns)
+
+    def _columns(self, side):
+        return self.src_columns if side == "source" else self.st_columns
+
+    @staticmethod
+    def _normalized(df, col):
+        return DataNormalizer.map_column(df[col], DataNormalizer.normalize_value)
+
+    def values(self, df, side):
+        """
+        Normalized key of every row of df ("source" or "sitetracker").
+        """
+        columns = self._columns(side)
+        if not self.composite:
+            return self._normalized(df, columns[0])
+        return DataNormalizer.composite_key([self._normalized(df, c) for c in columns])
+
+    def add(self, df, side):
+        """
+        Set the key column on df.
+        """
+        df[self.src if side == "source" else self.st] = self.values(df, side)
+        return df
+
+    def labels(self, df, side, rows=None):
+        """
+        Readable key of df's rows at positions rows (all when None): the
+        key column itself, or a composite key's normalized parts joined
+        as "PX1 | Site A".
+        """
+        if not self.composite:
+            keys = df[self.src if side == "source" else self.st]
+            return np.asarray((keys if rows is None else keys.iloc[rows]).astype(object))
+        return key_labels(df, self._columns(side), rows)
+
+    def valid(self, src_df):
+        """
+        Rows with a usable key: the first part must be a valid project
+        reference, further parts of a composite key must not be blank.
+        """
+        first = self.src if not self.composite else self.src_columns[0]
+        valid = DataNormalizer.map_column(
+            self._normalized(src_df, first) if self.composite else src_df[first],
+            DataNormalizer.valid_project_ref
+        ).astype(bool)
+
+        for col in self.src_columns[1:]:
+            valid &= (self._normalized(src_df, col).astype(object) != "").to_numpy()
+        return valid
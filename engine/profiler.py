@@ -0,0 +1,123 @@
+# engine/profiler.py
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_STATS = "profile.pstats"
+PROFILE_STACKS = "profile.collapsed"
+PROFILE_HOTSPOTS = "profile_hotspots.txt"
+DEFAULT_INTERVAL = 0.005
+DEFAULT_TOP = 30
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RunProfiler:
+    """
+    Profiles one engine run two ways at once:
+
+    - cProfile (deterministic) on the calling thread, for exact call
+      counts and own / cumulative time per function;
+    - a sampling thread that records the calling thread's stack each
+      interval seconds, for a flame graph of where wall time goes
+      (including time spent waiting on worker pools and I/O).
+
+    Other threads (the memory guard, pool management threads) spend
+    their time parked and are not sampled.
+
+    Work done inside worker processes (diff shards, parallel reads)
+    shows up only as the parent waiting on it.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, top=DEFAULT_TOP):
+        self.interval = interval
+        self.top = top
+        self.profile = cProfile.Profile()
+        self.stacks = Counter()
+        self.samples = 0
+        self.wall_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+        self._target = None
+
+    def _sample(self):
+        ident, name = self._target
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(name)
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self._target = (threading.get_ident(), threading.current_thread().name)
+        self._thread = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+        self._thread.start()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        self._stop.set()
+        self._thread.join()
+        self.wall_seconds = time.perf_counter() - self._started
+        return False
+
+    def hotspots(self):
+        """
+        Top functions by own time: (own s, cumulative s, calls, % of
+        profiled time, function).
+        """
+        stats = pstats.Stats(self.profile)
+        total = stats.total_tt or 1.0
+        rows = sorted(
+            (
+                (tt, ct, nc if nc == cc else f"{nc}/{cc}", 100 * tt / total,
+                 f"{func} ({os.path.basename(file)}:{line})")
+                for (file, line, func), (cc, nc, tt, ct, _) in stats.stats.items()
+            ),
+            key=lambda r: r[0],
+            reverse=True
+        )
+        return rows[:self.top]
+
+    def save(self, run_dir):
+        """
+        Write the pstats file, collapsed stacks (flamegraph.pl /
+        speedscope / inferno input) and hotspot table into run_dir.
+        """
+        paths = {
+            "stats": os.path.join(run_dir, PROFILE_STATS),
+            "stacks": os.path.join(run_dir, PROFILE_STACKS),
+            "hotspots": os.path.join(run_dir, PROFILE_HOTSPOTS)
+        }
+
+        self.profile.dump_stats(paths["stats"])
+
+        with open(paths["stacks"], "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        with open(paths["hotspots"], "w", encoding="utf-8") as f:
+            f.write(f"Wall time: {self.wall_seconds:.3f}s\n")
+            f.write(f"Stack samples: {self.samples} every {self.interval * 1000:g} ms\n\n")
+            f.write(f"==== TOP {self.top} FUNCTIONS BY OWN TIME ====\n")
+            f.write(f"{'own s':>9} {'cum s':>9} {'calls':>12} {'own %':>6}  function\n")
+            for tt, ct, calls, share, name in self.hotspots():
+                f.write(f"{tt:9.3f} {ct:9.3f} {str(calls):>12} {share:6.1f}  {name}\n")
+
+        return paths
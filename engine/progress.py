@@ -0,0 +1,100 @@
+# engine/progress.py
+
+import json
+import sys
+import time
+
+PROGRESS_PREFIX = "PROGRESS "
+
+
+class ProgressReporter:
+    """
+    Structured progress events for one engine run.
+
+    Every event is a dict passed to callback:
+        {"event": "stage_started" | "progress" | "stage_finished",
+         "stage": str, "rows": int | None, "total": int | None,
+         "rows_per_second": float | None, "elapsed": float}
+
+    Stage start/finish events are always delivered; "progress" events
+    are throttled to one per min_interval seconds per stage, so advance()
+    can be called from hot loops. Without a callback everything is a no-op.
+    """
+
+    def __init__(self, callback=None, min_interval=0.25):
+        self.callback = callback
+        self.min_interval = min_interval
+        self._started = {}
+        self._last_emit = {}
+        self._totals = {}
+
+    def _emit(self, event, stage, rows=None, total=None):
+        elapsed = time.perf_counter() - self._started.get(stage, time.perf_counter())
+        self.callback({
+            "event": event,
+            "stage": stage,
+            "rows": rows,
+            "total": total,
+            "rows_per_second": round(rows / elapsed, 1) if rows and elapsed > 0 else None,
+            "elapsed": round(elapsed, 3)
+        })
+
+    def stage_started(self, stage, total=None):
+        if self.callback is None:
+            return
+        self._started[stage] = time.perf_counter()
+        self._last_emit[stage] = 0.0
+        self._totals[stage] = total
+        self._emit("stage_started", stage, 0 if total is not None else None, total)
+
+    def advance(self, stage, rows, total=None):
+        if self.callback is None:
+            return
+        now = time.perf_counter()
+        if now - self._last_emit.get(stage, 0.0) < self.min_interval:
+            return
+        self._last_emit[stage] = now
+        if total is not None:
+            self._totals[stage] = total
+        self._emit("progress", stage, rows, self._totals.get(stage))
+
+    def stage_finished(self, stage, rows=None):
+        if self.callback is None:
+            return
+        total = self._totals.get(stage)
+        self._emit("stage_finished", stage, rows if rows is not None else total, total)
+
+
+def json_lines(stream=None):
+    """
+    Callback writing each event as a "PROGRESS {json}" line.
+    """
+    def write(event):
+        out = stream or sys.stdout
+        out.write(PROGRESS_PREFIX + json.dumps(event) + "\n")
+        out.flush()
+    return write
+
+
+def progress_bar(stream=None, width=30):
+    """
+    Callback drawing a one-line text progress bar per stage.
+    """
+    def draw(event):
+        out = stream or sys.stderr
+        rows, total = event["rows"], event["total"]
+        rate = f" {event['rows_per_second']:,.0f} rows/s" if event["rows_per_second"] else ""
+
+        if total:
+            done = min(1.0, (rows or 0) / total)
+            bar = "#" * int(done * width) + "-" * (width - int(done * width))
+            line = f"[{event['stage']}] {bar} {done:4.0%} {rows or 0:,}/{total:,}{rate}"
+        else:
+            line = f"[{event['stage']}] {rows or 0:,} rows{rate}" if rows else f"[{event['stage']}] ..."
+
+        if event["event"] == "stage_finished":
+            out.write(f"\r{line} ({event['elapsed']:.1f}s)\n")
+        else:
+            out.write(f"\r{line}")
+        out.flush()
+    return draw
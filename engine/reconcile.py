@@ -0,0 +1,126 @@
+# engine/reconcile.py
+
+import re
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+RECONCILE_COLUMNS = ["Side", "Key", "Best Match", "Similarity", "Other Matches"]
+
+SOURCE_ONLY = "Source only"
+SITETRACKER_ONLY = "Sitetracker only"
+
+
+def _canonical(key):
+    return re.sub(r"\s+", " ", str(key)).strip().casefold()
+
+
+def trigrams(key):
+    """
+    Set of 3-character grams of the canonical key, padded like pg_trgm so
+    short keys and key starts still produce grams.
+    """
+    padded = f"  {_canonical(key)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Inverted index from trigram to the keys containing it.
+
+    Candidates come only from the query's selective trigrams (posting
+    lists no longer than max_posting); grams shared by most keys, such as
+    a common "PX71-" prefix, would otherwise make every lookup scan the
+    whole index. Candidates are then scored exactly.
+    """
+
+    def __init__(self, keys, max_posting=None):
+        self.keys = list(keys)
+        self.grams = [frozenset(trigrams(k)) for k in self.keys]
+        self.max_posting = max_posting or max(100, len(self.keys) // 100)
+
+        postings = defaultdict(list)
+        for i, grams in enumerate(self.grams):
+            for gram in grams:
+                postings[gram].append(i)
+        self.postings = {g: np.array(ids, dtype=np.int64) for g, ids in postings.items()}
+
+    def _candidates(self, grams, count):
+        lists = [self.postings[g] for g in grams if g in self.postings]
+        if not lists:
+            return []
+
+        selective = [p for p in lists if len(p) <= self.max_posting]
+        if not selective:
+            # Only common grams: the shortest list still bounds the work
+            selective = [min(lists, key=len)]
+
+        ids, shared = np.unique(np.concatenate(selective), return_counts=True)
+        best = np.lexsort((ids, -shared))[:count]
+        return ids[best]
+
+    def search(self, query, limit=3, min_similarity=0.65, candidates=50):
+        """
+        Up to limit (key, similarity) pairs, best first. Similarity is the
+        Dice coefficient of the trigram sets.
+        """
+        grams = trigrams(query)
+        scored = []
+        for i in self._candidates(grams, candidates):
+            similarity = 2 * len(grams & self.grams[i]) / (len(grams) + len(self.grams[i]))
+            if similarity >= min_similarity:
+                scored.append((-similarity, i))
+
+        # Best first; ties in index order so results are deterministic
+        return [(self.keys[i], round(-neg, 3)) for neg, i in sorted(scored)[:limit]]
+
+
+def _side_rows(side, keys, index, limit, min_similarity, progress=None, offset=0, total=0):
+    rows = []
+    for n, key in enumerate(keys):
+        if progress is not None:
+            progress(offset + n, total)
+        matches = index.search(key, limit, min_similarity) if index.keys else []
+        best, score = matches[0] if matches else ("", None)
+        rows.append({
+            "Side": side,
+            "Key": key,
+            "Best Match": best,
+            "Similarity": score,
+            "Other Matches": "; ".join(f"{k} ({s})" for k, s in matches[1:])
+        })
+    return rows
+
+
+def _present_keys(keys):
+    # Distinct keys in first-seen order; missing, blank and whitespace-only keys are not keys
+    keys = pd.Series(keys, dtype=object).dropna()
+    return pd.unique(keys[keys.astype(str).str.strip() != ""])
+
+
+def reconcile_keys(src_keys, st_keys, limit=3, min_similarity=0.65, progress=None):
+    """
+    Keys present on only one side, each with the closest keys found only
+    on the other side (typos, suffixes, case or spacing differences).
+    progress(done, total) is called per unmatched key.
+    """
+    src_unique = _present_keys(src_keys)
+    st_unique = _present_keys(st_keys)
+
+    st_set = set(st_unique)
+    src_set = set(src_unique)
+    src_only = [k for k in src_unique if k not in st_set]
+    st_only = [k for k in st_unique if k not in src_set]
+
+    total = len(src_only) + len(st_only)
+    rows = _side_rows(
+        SOURCE_ONLY, src_only, TrigramIndex(st_only), limit, min_similarity,
+        progress, 0, total
+    )
+    rows += _side_rows(
+        SITETRACKER_ONLY, st_only, TrigramIndex(src_only), limit, min_similarity,
+        progress, len(src_only), total
+    )
+
+    return pd.DataFrame(rows, columns=RECONCILE_COLUMNS)
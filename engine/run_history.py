@@ -0,0 +1,222 @@
+# engine/run_history.py
+
+import hashlib
+import os
+import sqlite3
+from contextlib import closing
+
+HISTORY_DB_NAME = "run_history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    report_name TEXT NOT NULL,
+    run_day TEXT NOT NULL,
+    run_time TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    status TEXT NOT NULL,
+    run_dir TEXT,
+    valid_records INTEGER,
+    delta_records INTEGER,
+    fields_updated INTEGER,
+    duplicate_keys INTEGER,
+    invalid_keys INTEGER,
+    invalid_dates INTEGER,
+    duration_seconds REAL,
+    error TEXT,
+    fingerprint TEXT
+);
+
+CREATE TABLE IF NOT EXISTS run_stages (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    seconds REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS run_inputs (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS run_outputs (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_runs_report_started ON runs(report_name, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_status ON runs(status);
+CREATE INDEX IF NOT EXISTS idx_runs_report_fingerprint ON runs(report_name, fingerprint);
+CREATE INDEX IF NOT EXISTS idx_run_stages_run ON run_stages(run_id);
+CREATE INDEX IF NOT EXISTS idx_run_inputs_run ON run_inputs(run_id);
+CREATE INDEX IF NOT EXISTS idx_run_inputs_sha ON run_inputs(sha256);
+CREATE INDEX IF NOT EXISTS idx_run_outputs_run ON run_outputs(run_id);
+"""
+
+COUNT_COLUMNS = [
+    "valid_records",
+    "delta_records",
+    "fields_updated",
+    "duplicate_keys",
+    "invalid_keys",
+    "invalid_dates",
+]
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RunHistory:
+    """
+    Indexed SQLite record of engine runs (one row per run plus its
+    stage timings, input hashes and output paths).
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with closing(self._connect()) as conn, conn:
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(runs)")}
+            if columns and "fingerprint" not in columns:
+                conn.execute("ALTER TABLE runs ADD COLUMN fingerprint TEXT")
+            conn.executescript(SCHEMA)
+
+    @staticmethod
+    def default_path(base_dir=None):
+        return os.path.join(base_dir or os.getcwd(), HISTORY_DB_NAME)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def record_run(self, run: dict) -> int:
+        """
+        run keys: report_name, run_day, run_time, started_at, finished_at,
+        status, run_dir, the COUNT_COLUMNS, duration_seconds, error, fingerprint,
+        stages {name: seconds}, inputs [{role, file_name, sha256, size_bytes}],
+        outputs {name: path}.
+        """
+        columns = [
+            "report_name", "run_day", "run_time", "started_at", "finished_at",
+            "status", "run_dir", *COUNT_COLUMNS, "duration_seconds", "error",
+            "fingerprint"
+        ]
+
+        with closing(self._connect()) as conn, conn:
+            cur = conn.execute(
+                f"INSERT INTO runs ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                [run.get(c) for c in columns]
+            )
+            run_id = cur.lastrowid
+
+            conn.executemany(
+                "INSERT INTO run_stages (run_id, stage, seconds) VALUES (?, ?, ?)",
+                [(run_id, stage, secs) for stage, secs in run.get("stages", {}).items()]
+            )
+            conn.executemany(
+                "INSERT INTO run_inputs (run_id, role, file_name, sha256, size_bytes) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (run_id, i["role"], i["file_name"], i["sha256"], i["size_bytes"])
+                    for i in run.get("inputs", [])
+                ]
+            )
+            conn.executemany(
+                "INSERT INTO run_outputs (run_id, name, path) VALUES (?, ?, ?)",
+                [(run_id, name, path) for name, path in run.get("outputs", {}).items()]
+            )
+
+        return run_id
+
+    @staticmethod
+    def _where(report_name=None, since=None, until=None, status=None):
+        clauses, params = [], []
+        if report_name:
+            clauses.append("report_name = ?")
+            params.append(report_name)
+        if since:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("started_at < ?")
+            params.append(until)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def runs(self, report_name=None, since=None, until=None, status=None, limit=100):
+        """
+        Most recent runs first. since/until are ISO timestamps or dates
+        (until is exclusive).
+        """
+        where, params = self._where(report_name, since, until, status)
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT * FROM runs{where} ORDER BY started_at DESC, id DESC LIMIT ?",
+                params + [limit]
+            ).fetchall()
+            return [dict(r) for r in rows]
+
+    def last_run_with_fingerprint(self, report_name, fingerprint):
+        """
+        Latest successful run of the report that processed identical inputs.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT id FROM runs WHERE report_name = ? AND fingerprint = ? "
+                "AND status = 'success' ORDER BY started_at DESC, id DESC LIMIT 1",
+                (report_name, fingerprint)
+            ).fetchone()
+        return self.run_details(row["id"]) if row else None
+
+    def run_details(self, run_id: int):
+        with closing(self._connect()) as conn:
+            run = conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if run is None:
+                return None
+
+            details = dict(run)
+            details["stages"] = {
+                r["stage"]: r["seconds"]
+                for r in conn.execute("SELECT stage, seconds FROM run_stages WHERE run_id = ?", (run_id,))
+            }
+            details["inputs"] = [
+                dict(r) for r in conn.execute(
+                    "SELECT role, file_name, sha256, size_bytes FROM run_inputs WHERE run_id = ?",
+                    (run_id,)
+                )
+            ]
+            details["outputs"] = {
+                r["name"]: r["path"]
+                for r in conn.execute("SELECT name, path FROM run_outputs WHERE run_id = ?", (run_id,))
+            }
+            return details
+
+    def totals(self, report_name=None, since=None, until=None, status="success"):
+        """
+        Aggregated counts, e.g. deltas produced by a report this month:
+        totals("Apollo 10G", since="2026-10-01")["delta_records"]
+        """
+        where, params = self._where(report_name, since, until, status)
+        sums = ", ".join(f"COALESCE(SUM({c}), 0) AS {c}" for c in COUNT_COLUMNS)
+
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT COUNT(*) AS runs, {sums}, "
+                f"COALESCE(SUM(duration_seconds), 0) AS duration_seconds FROM runs{where}",
+                params
+            ).fetchone()
+            return dict(row)
@@ -0,0 +1,164 @@
+# engine/snapshot.py
+
+import hashlib
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from engine.file_reader import CHUNK_ROWS, arrow_frame, sitetracker_batches
+from engine.normalizer import DataNormalizer
+from engine.run_history import file_sha256
+
+SNAPSHOT_DIR_NAME = "snapshots"
+
+
+class SnapshotStore:
+    """
+    Arrow IPC (Feather v2) snapshots of parsed Sitetracker exports.
+
+    Each accepted CSV is parsed once into <root>/<sha256>.arrow (cleaned
+    headers, every column a string, uncompressed so it can be
+    memory-mapped). Runs, previews and the portal then map the file and
+    read only the columns they need; processes mapping the same snapshot
+    share its pages through the OS cache.
+
+    A key index (<sha256>.<column>.idx.arrow) holds the sorted, normalized
+    values of one key column with their row numbers, so point lookups
+    touch only the index and the matching rows.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, sha256):
+        return os.path.join(self.root, f"{sha256}.arrow")
+
+    def index_path(self, sha256, column):
+        tag = hashlib.sha1(column.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.root, f"{sha256}.{tag}.idx.arrow")
+
+    @staticmethod
+    def _write(table, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _open(path):
+        return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+    def ensure(self, csv_path, sha256=None):
+        """
+        Snapshot for a Sitetracker CSV, built on first use. Returns its sha256.
+        """
+        sha256 = sha256 or file_sha256(csv_path)
+        path = self.path(sha256)
+
+        if os.path.exists(path):
+            # mtime marks recent use for prune()
+            os.utime(path)
+        else:
+            self._build(csv_path, path)
+
+        return sha256
+
+    @staticmethod
+    def _build(csv_path, path):
+        # Parsed by Arrow batch by batch (CHUNK_ROWS rows), so building a
+        # snapshot never holds the whole export or a Python object per cell
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        sink, writer = None, None
+        try:
+            for table in sitetracker_batches(csv_path):
+                names = [DataNormalizer.clean_header(c) for c in table.column_names]
+                table = table.rename_columns(names)
+                if writer is None:
+                    sink = pa.OSFile(tmp, "wb")
+                    writer = pa.ipc.new_file(sink, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+            if sink is not None:
+                sink.close()
+        os.replace(tmp, path)
+
+    def read(self, sha256, needed=None, nrows=None, arrow_strings=False):
+        """
+        DataFrame of the needed columns (all when None). arrow_strings
+        keeps the mapped Arrow buffers as string[pyarrow] columns instead
+        of copying them into Python objects.
+        """
+        table = self._open(self.path(sha256))
+        if needed is not None:
+            table = table.select([c for c in table.column_names if c in needed])
+        if nrows is not None:
+            table = table.slice(0, nrows)
+
+        return arrow_frame(table, arrow_strings)
+
+    def batches(self, sha256, needed=None, arrow_strings=False):
+        """
+        The snapshot as a sequence of DataFrames, one per record batch,
+        for reading it in bounded memory.
+        """
+        reader = pa.ipc.open_file(pa.memory_map(self.path(sha256), "r"))
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if needed is not None:
+                batch = batch.select([c for c in batch.schema.names if c in needed])
+            yield arrow_frame(pa.Table.from_batches([batch]), arrow_strings)
+
+    def _index(self, sha256, column):
+        path = self.index_path(sha256, column)
+        if not os.path.exists(path):
+            keys = self._open(self.path(sha256))[column].to_pandas()
+            keys = DataNormalizer.map_column(keys, DataNormalizer.normalize_value)
+            keys = pa.array(keys.astype(object), type=pa.string())
+
+            order = pc.sort_indices(keys)
+            self._write(
+                pa.table({"key": keys.take(order), "row": order.cast(pa.int64())}),
+                path
+            )
+        return self._open(path)
+
+    def lookup(self, sha256, column, keys, needed=None):
+        """
+        Snapshot rows whose normalized key column value is in keys, in
+        snapshot order.
+        """
+        index = self._index(sha256, column)
+        hits = pc.is_in(index["key"], value_set=pa.array([str(k) for k in keys], type=pa.string()))
+        rows = np.sort(index["row"].filter(hits).to_numpy())
+
+        table = self._open(self.path(sha256))
+        if needed is not None:
+            table = table.select([c for c in table.column_names if c in needed])
+        return table.take(rows).to_pandas()
+
+    def prune(self, keep=5):
+        """
+        Delete all but the keep most recently used snapshots and their
+        indexes. Returns the number of snapshots removed.
+        """
+        if not os.path.isdir(self.root):
+            return 0
+
+        snapshots = sorted(
+            (f for f in os.listdir(self.root) if f.endswith(".arrow") and ".idx." not in f),
+            key=lambda f: os.path.getmtime(os.path.join(self.root, f)),
+            reverse=True
+        )
+        doomed = snapshots[keep:]
+        for name in doomed:
+            sha256 = name[:-len(".arrow")]
+            for f in os.listdir(self.root):
+                if f.startswith(sha256 + "."):
+                    os.remove(os.path.join(self.root, f))
+        return len(doomed)
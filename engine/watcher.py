@@ -0,0 +1,193 @@
+# engine/watcher.py
+
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import time
+
+from engine.config_loader import configured_reports
+from engine.input_file_engine import InputFileEngine, SkipRun
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0x00000800
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+DEFAULT_DEBOUNCE_SECONDS = 10
+DEFAULT_POLL_INTERVAL = 2
+
+
+class InotifyWaiter:
+    """
+    Blocks until something changes in one of the watched folders, using
+    Linux inotify through libc.
+    """
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watched = set()
+
+    def watch(self, folder):
+        if folder in self.watched or not os.path.isdir(folder):
+            return
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {folder}")
+        self.watched.add(folder)
+
+    def wait(self, timeout):
+        """
+        True if events arrived within timeout seconds.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        # Drain the queue; the folders are re-scanned, so the events themselves don't matter
+        while True:
+            try:
+                os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWaiter:
+    """
+    Fallback where inotify is unavailable: every wait is a plain sleep
+    and the folders are re-scanned afterwards.
+    """
+
+    def __init__(self, interval=DEFAULT_POLL_INTERVAL):
+        self.interval = interval
+
+    def watch(self, folder):
+        pass
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        return True
+
+    def close(self):
+        pass
+
+
+def make_waiter(poll_interval=DEFAULT_POLL_INTERVAL):
+    try:
+        return InotifyWaiter()
+    except (OSError, AttributeError, TypeError) as e:
+        print(f"[WATCH] inotify unavailable ({e}); polling every {poll_interval}s")
+        return PollingWaiter(poll_interval)
+
+
+class ReportWatch:
+    """
+    Input-folder state of one report. ready() once both folders hold
+    matching files whose sizes and mtimes have not changed for the
+    report's debounce period.
+    """
+
+    def __init__(self, report_name):
+        self.report_name = report_name
+        engine = InputFileEngine(report_name)
+        watch_cfg = engine.yaml_cfg.get("watch", {})
+
+        self.folders = [
+            (engine.source_dir, engine.source_spec.get("pattern", "*")),
+            (engine.sitetracker_dir, engine.sitetracker_spec.get("pattern", "*"))
+        ]
+        self.debounce = watch_cfg.get("debounce_seconds", DEFAULT_DEBOUNCE_SECONDS)
+
+        self.state = None
+        self.stable_since = None
+        self.last_run_state = None
+
+    def scan(self):
+        state = []
+        for folder, pattern in self.folders:
+            files = []
+            if os.path.isdir(folder):
+                for name in sorted(os.listdir(folder)):
+                    path = os.path.join(folder, name)
+                    if name.startswith(".") or not fnmatch.fnmatch(name, pattern):
+                        continue
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((name, st.st_size, st.st_mtime_ns))
+            state.append(tuple(files))
+        return tuple(state)
+
+    def update(self, now):
+        state = self.scan()
+        if state != self.state:
+            self.state = state
+            self.stable_since = now
+
+    def pending(self):
+        return bool(self.state) and all(self.state) and self.state != self.last_run_state
+
+    def ready(self, now):
+        return self.pending() and now - self.stable_since >= self.debounce
+
+    def run(self):
+        self.last_run_state = self.state
+        print(f"[WATCH] Inputs settled for {self.report_name}; starting run")
+        try:
+            InputFileEngine(self.report_name).run()
+        except SkipRun as e:
+            print(f"[SKIP] {e}")
+        except Exception as e:
+            # One bad drop must not stop watching the other reports
+            print(f"[WATCH] Run failed for {self.report_name}: {type(e).__name__}: {e}")
+
+
+def watch(report_names=None, poll_interval=DEFAULT_POLL_INTERVAL, idle_timeout=60):
+    """
+    Watch the input folders of the given (default: all configured) reports
+    and run each report once its source and Sitetracker inputs are in
+    place and have stopped changing. Runs until interrupted.
+
+    Folders created after start-up are picked up within idle_timeout.
+    """
+    reports = [ReportWatch(name) for name in (report_names or configured_reports())]
+    if not reports:
+        raise Exception("No reports configured to watch")
+
+    waiter = make_waiter(poll_interval)
+    print("[WATCH] Watching: " + ", ".join(r.report_name for r in reports))
+
+    try:
+        while True:
+            now = time.monotonic()
+            for report in reports:
+                for folder, _ in report.folders:
+                    waiter.watch(folder)
+                report.update(now)
+                if report.ready(now):
+                    report.run()
+                    report.update(time.monotonic())
+
+            pending = [
+                r.stable_since + r.debounce - now for r in reports if r.pending()
+            ]
+            # Wake for the earliest debounce deadline, or on the next change
+            timeout = max(0.1, min(pending)) if pending else idle_timeout
+            waiter.wait(timeout)
+    except KeyboardInterrupt:
+        print("[WATCH] Stopped")
+    finally:
+        waiter.close()
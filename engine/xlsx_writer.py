@@ -0,0 +1,70 @@
+# engine/xlsx_writer.py
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+XLSX_FILE = "run_outputs.xlsx"
+SUMMARY_SHEET = "Summary"
+# Excel's row limit, header included; longer frames continue on "<name> (2)", ...
+MAX_SHEET_ROWS = 1_048_576
+ROW_BLOCK = 10_000
+
+
+def _cell_values(block):
+    """
+    Rows of a frame slice as lists of plain Python values: blanks as
+    None, numpy scalars unwrapped.
+    """
+    values = block.astype(object).where(block.notna(), None).to_numpy()
+    for row in values:
+        yield [v.item() if isinstance(v, np.generic) else v for v in row]
+
+
+def _text_cell(ws, value):
+    # Strings are always written as text: strip characters XLSX cannot
+    # hold and never let a leading "=" turn a value into a formula
+    value = ILLEGAL_CHARACTERS_RE.sub("", value)
+    if not value.startswith("="):
+        return value
+    cell = WriteOnlyCell(ws, value)
+    cell.data_type = "s"
+    return cell
+
+
+def _write_frame(wb, name, df):
+    header = [str(c) for c in df.columns]
+    per_sheet = MAX_SHEET_ROWS - 1
+    sheets = max(1, -(-len(df) // per_sheet))
+
+    for part in range(sheets):
+        ws = wb.create_sheet(name if part == 0 else f"{name} ({part + 1})")
+        ws.append(header)
+        stop = min(len(df), (part + 1) * per_sheet)
+        for start in range(part * per_sheet, stop, ROW_BLOCK):
+            for row in _cell_values(df.iloc[start:min(start + ROW_BLOCK, stop)]):
+                ws.append([_text_cell(ws, v) if isinstance(v, str) else v for v in row])
+
+
+def write_xlsx(path, frames, summary):
+    """
+    Write a workbook with a Summary sheet (summary: list of (section,
+    metric, value) rows) followed by one sheet per (name, DataFrame) in
+    frames.
+
+    Uses openpyxl's write-only mode: rows are streamed to disk in blocks
+    of ROW_BLOCK, so the workbook never holds more than one block.
+    """
+    wb = Workbook(write_only=True)
+
+    ws = wb.create_sheet(SUMMARY_SHEET)
+    ws.append(["Section", "Metric", "Value"])
+    for section, metric, value in summary:
+        ws.append([section, metric, _text_cell(ws, value) if isinstance(value, str) else value])
+
+    for name, df in frames:
+        _write_frame(wb, name, df if df is not None else pd.DataFrame())
+
+    wb.save(path)
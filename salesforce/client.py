@@ -5,13 +5,24 @@ from auth.token_store import load_token
 
 
 class SalesforceClient:
-    def __init__(self):
-        token = load_token()
-        if not token:
-            raise RuntimeError("Not authenticated with Salesforce")
-
-        self.access_token = token["access_token"]
-        self.instance_url = token["instance_url"]
+    def __init__(self, instance_url=None, access_token=None, timeout=120):
+        """
+        Uses the stored OAuth token unless instance_url and access_token
+        are given (e.g. a local fake server).
+        """
+        if instance_url is None or access_token is None:
+            token = load_token()
+            if not token:
+                raise RuntimeError("Not authenticated with Salesforce")
+            instance_url = instance_url or token["instance_url"]
+            access_token = access_token or token["access_token"]
+
+        self.access_token = access_token
+        self.instance_url = instance_url.rstrip("/")
+        self.timeout = timeout
+        # One pooled connection per thread that uses this client concurrently
+        self.session = requests.Session()
+        self.session.mount(self.instance_url, requests.adapters.HTTPAdapter(pool_maxsize=32))
 
         self.headers = {
             "Authorization": f"Bearer {self.access_token}",
@@ -23,11 +34,11 @@ class SalesforceClient:
         Generic GET request to Salesforce REST API
         """
         url = f"{self.instance_url}{path}"
-        response = requests.get(url, headers=self.headers, params=params)
+        response = self.session.get(url, headers=self.headers, params=params, timeout=self.timeout)
 
         if response.status_code >= 400:
             raise RuntimeError(
                 f"Salesforce API error {response.status_code}: {response.text}"
             )
 
-        return response.json()
\ No newline at end of file
+        return response.json()
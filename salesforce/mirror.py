@@ -0,0 +1,397 @@
+# salesforce/mirror.py
+#
+# Local SQLite mirror of the Salesforce objects a report's mapping names.
+#
+# Run: python -m salesforce.mirror --report "Apollo 10G" [--full]
+
+import argparse
+import os
+import re
+import sqlite3
+import tempfile
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from salesforce.bulk_export import API_VERSION, BulkExporter
+from salesforce.client import SalesforceClient
+
+MIRROR_DB_NAME = "sitetracker_mirror.db"
+MODSTAMP = "SystemModstamp"
+# Re-read this much before the watermark: a record committed late by a long
+# transaction can carry a SystemModstamp earlier than records already seen
+LOOKBACK = timedelta(minutes=5)
+# getDeleted only reaches back 30 days; older watermarks need a full reload
+DELETED_RETENTION = timedelta(days=29)
+INSERT_BATCH = 5_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mirror_state (
+    sobject       TEXT PRIMARY KEY,
+    fields        TEXT NOT NULL,
+    watermark     TEXT,
+    deleted_until TEXT,
+    synced_at     TEXT NOT NULL,
+    row_count     INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS mirror_objects (
+    label   TEXT PRIMARY KEY,
+    sobject TEXT NOT NULL
+);
+"""
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _parse_sf_datetime(value):
+    # 2026-01-31T10:15:00.000+0000, 2026-01-31T10:15:00Z or ...+00:00
+    value = re.sub(r"([+-]\d\d)(\d\d)$", r"\1:\2", value.replace("Z", "+00:00"))
+    return datetime.fromisoformat(value)
+
+
+def _soql_datetime(dt):
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SalesforceMirror:
+    """
+    One table per object (every column TEXT, Id the primary key) plus a
+    mirror_state row per object holding its SystemModstamp watermark.
+
+    The first sync loads the object with the Id-chunked BulkExporter.
+    Later syncs query only records with SystemModstamp after the watermark
+    (less LOOKBACK) and upsert them, then remove the Ids getDeleted reports
+    since the previous sync. A full reload happens when the mapped fields
+    change or the deleted-records window has expired.
+    """
+
+    def __init__(self, db_path: str, client=None, api_version=API_VERSION):
+        self.db_path = db_path
+        self.client = client
+        self.api_version = api_version
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(SCHEMA)
+
+    @staticmethod
+    def default_path(base_dir=None):
+        return os.path.join(base_dir or os.getcwd(), MIRROR_DB_NAME)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    def _client(self):
+        if self.client is None:
+            self.client = SalesforceClient()
+        return self.client
+
+    def state(self, sobject):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM mirror_state WHERE sobject = ?", (sobject,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def known_objects(self):
+        """
+        {mapping Object Name: API name} resolved by earlier syncs, so the
+        mirror can be read without a Salesforce connection.
+        """
+        with closing(self._connect()) as conn:
+            return {r["label"]: r["sobject"] for r in conn.execute("SELECT * FROM mirror_objects")}
+
+    def remember_objects(self, names):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO mirror_objects (label, sobject) VALUES (?, ?)",
+                list(names.items())
+            )
+
+    def resolve_objects(self, names):
+        """
+        Salesforce API names for mapping Object Name values, matched on
+        the object's label or API name (case-insensitive).
+        """
+        sobjects = self._client().get(f"/services/data/{self.api_version}/sobjects")
+        by_name = {}
+        for obj in sobjects.get("sobjects", []):
+            by_name.setdefault(obj["label"].casefold(), obj["name"])
+            by_name.setdefault(obj["name"].casefold(), obj["name"])
+
+        missing = [n for n in names if n.casefold() not in by_name]
+        if missing:
+            raise Exception(f"Salesforce objects not found: {', '.join(missing)}")
+        return {n: by_name[n.casefold()] for n in names}
+
+    @staticmethod
+    def _write_rows(conn, sobject, fields, rows):
+        placeholders = ", ".join("?" for _ in fields)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {_quote(sobject)} ({', '.join(map(_quote, fields))}) "
+            f"VALUES ({placeholders})",
+            rows
+        )
+
+    def _full_load(self, conn, sobject, fields):
+        conn.execute(f"DROP TABLE IF EXISTS {_quote(sobject)}")
+        conn.execute(
+            f"CREATE TABLE {_quote(sobject)} ("
+            + ", ".join(f"{_quote(f)} TEXT" + (" PRIMARY KEY" if f == "Id" else "") for f in fields)
+            + ")"
+        )
+
+        with tempfile.TemporaryDirectory(prefix="mirror-") as tmp:
+            manifest = BulkExporter(self._client(), self.api_version).export(
+                [sobject], tmp, fields={sobject: fields}
+            )
+            parquet = pq.ParquetFile(os.path.join(tmp, manifest["objects"][sobject]["file"]))
+            for batch in parquet.iter_batches(batch_size=INSERT_BATCH, columns=fields):
+                columns = [c.to_pylist() for c in batch.columns]
+                self._write_rows(conn, sobject, fields, zip(*columns))
+
+        row = conn.execute(f"SELECT MAX({_quote(MODSTAMP)}) FROM {_quote(sobject)}").fetchone()
+        return manifest["objects"][sobject]["rows"], row[0]
+
+    def _changed_since(self, conn, sobject, fields, watermark):
+        since = _soql_datetime(_parse_sf_datetime(watermark) - LOOKBACK)
+        soql = (
+            f"SELECT {', '.join(fields)} FROM {sobject} "
+            f"WHERE {MODSTAMP} > {since} ORDER BY {MODSTAMP}"
+        )
+
+        upserted, latest = 0, watermark
+        page = self._client().get(
+            f"/services/data/{self.api_version}/query", params={"q": soql}
+        )
+        while True:
+            records = page.get("records", [])
+            self._write_rows(conn, sobject, fields, (
+                [None if r.get(f) is None else str(r.get(f)) for f in fields] for r in records
+            ))
+            upserted += len(records)
+            if records:
+                latest = max(latest, records[-1][MODSTAMP])
+            if page.get("done", True) or not page.get("nextRecordsUrl"):
+                return upserted, latest
+            page = self._client().get(page["nextRecordsUrl"])
+
+    def _deleted_since(self, conn, sobject, start, end):
+        """
+        Remove records getDeleted reports between start and end. Returns
+        (deleted, latestDateCovered).
+        """
+        result = self._client().get(
+            f"/services/data/{self.api_version}/sobjects/{sobject}/deleted/",
+            params={
+                "start": start.astimezone(timezone.utc).isoformat(timespec="seconds"),
+                "end": end.astimezone(timezone.utc).isoformat(timespec="seconds")
+            }
+        )
+        ids = [(r["id"],) for r in result.get("deletedRecords", [])]
+        conn.executemany(f"DELETE FROM {_quote(sobject)} WHERE Id = ?", ids)
+        return len(ids), result.get("latestDateCovered")
+
+    def sync(self, sobject, fields, full=False):
+        """
+        Bring one object up to date. fields are API names; Id and
+        SystemModstamp are always mirrored. Returns what was done.
+        """
+        fields = list(dict.fromkeys(["Id", MODSTAMP, *fields]))
+        now = datetime.now(timezone.utc)
+        state = self.state(sobject)
+
+        deleted_until = _parse_sf_datetime(state["deleted_until"]) if state else None
+        if state and not full:
+            full = (
+                state["fields"] != ",".join(fields)
+                or state["watermark"] is None
+                or now - deleted_until > DELETED_RETENTION
+            )
+
+        with closing(self._connect()) as conn, conn:
+            if state is None or full:
+                upserted, watermark = self._full_load(conn, sobject, fields)
+                deleted, deleted_until = 0, now.strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+                mode = "full"
+            else:
+                upserted, watermark = self._changed_since(conn, sobject, fields, state["watermark"])
+                if now - deleted_until >= timedelta(minutes=1):
+                    deleted, covered = self._deleted_since(conn, sobject, deleted_until, now)
+                    deleted_until = covered or now.strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+                else:
+                    # getDeleted needs a window of at least a minute
+                    deleted, deleted_until = 0, state["deleted_until"]
+                mode = "incremental"
+
+            row_count = conn.execute(f"SELECT COUNT(*) FROM {_quote(sobject)}").fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO mirror_state "
+                "(sobject, fields, watermark, deleted_until, synced_at, row_count) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (sobject, ",".join(fields), watermark, deleted_until,
+                 now.isoformat(timespec="seconds"), row_count)
+            )
+
+        return {
+            "sobject": sobject,
+            "mode": mode,
+            "upserted": upserted,
+            "deleted": deleted,
+            "rows": row_count,
+            "watermark": watermark
+        }
+
+    def sitetracker_frame(self, main, columns, lookups=None):
+        """
+        The mirror shaped like a Sitetracker export of main: its Id plus
+        columns [(sobject, api_field, header)], fields of other objects
+        joined through lookups {sobject: lookup field on main}.
+        """
+        lookups = lookups or {}
+        select = [f"m.{_quote('Id')} AS {_quote('Id')}"]
+        joins, aliases = [], {main: "m"}
+
+        for sobject, api_field, header in columns:
+            if sobject not in aliases:
+                if sobject not in lookups:
+                    raise Exception(
+                        f"No lookup from {main} to {sobject}: set mirror.lookups.{sobject}"
+                    )
+                aliases[sobject] = f"r{len(aliases)}"
+                joins.append(
+                    f"LEFT JOIN {_quote(sobject)} {aliases[sobject]} "
+                    f"ON {aliases[sobject]}.{_quote('Id')} = m.{_quote(lookups[sobject])}"
+                )
+            select.append(f"{aliases[sobject]}.{_quote(api_field)} AS {_quote(header)}")
+
+        sql = (
+            f"SELECT {', '.join(select)} FROM {_quote(main)} m "
+            + " ".join(joins)
+            + f" ORDER BY m.{_quote('Id')}"
+        )
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(sql, conn)
+
+
+class ReportMirror:
+    """
+    The mirror as one report sees it: which objects and fields its
+    mapping names, and how to write them as the report's Sitetracker input.
+
+    mirror config (report YAML):
+        db_path:  SQLite file (default <work_dir>/sitetracker_mirror.db)
+        objects:  {mapping Object Name: API name}, where the label lookup
+                  is ambiguous
+        lookups:  {mapping Object Name: lookup field on the primary key's
+                  object}, for fields mapped from related objects
+    """
+
+    def __init__(self, mapping_df, mirror_cfg, base_dir, client=None):
+        self.mapping_df = mapping_df
+        self.cfg = mirror_cfg or {}
+        self.mirror = SalesforceMirror(self.db_path(self.cfg, base_dir), client)
+
+        pk_rows = mapping_df[mapping_df["Primary Key?"].str.strip().str.upper() == "YES"]
+        self.main_label = pk_rows.iloc[0]["Object Name"]
+        self.object_labels = list(dict.fromkeys(mapping_df["Object Name"].dropna()))
+        self._api_names = {**self.mirror.known_objects(), **(self.cfg.get("objects") or {})}
+
+    @staticmethod
+    def db_path(mirror_cfg, base_dir):
+        return (mirror_cfg or {}).get("db_path") or SalesforceMirror.default_path(base_dir)
+
+    def api_names(self, resolve=True):
+        missing = [n for n in self.object_labels if n not in self._api_names]
+        if missing and resolve:
+            self._api_names.update(self.mirror.resolve_objects(missing))
+            self.mirror.remember_objects(self._api_names)
+        return self._api_names
+
+    def _lookups(self):
+        return {
+            self._api_names.get(label, label): field
+            for label, field in (self.cfg.get("lookups") or {}).items()
+        }
+
+    def sync(self, full=False):
+        names = self.api_names()
+        lookups = self._lookups()
+        main = names[self.main_label]
+
+        results = []
+        for label in self.object_labels:
+            sobject = names[label]
+            fields = list(self.mapping_df.loc[self.mapping_df["Object Name"] == label, "API Name"])
+            if sobject == main:
+                fields += list(lookups.values())
+            results.append(self.mirror.sync(sobject, fields, full=full))
+        return results
+
+    def synced_at(self):
+        """
+        Oldest sync time over the report's objects (None when never synced).
+        """
+        names = self.api_names(resolve=False)
+        if any(label not in names for label in self.object_labels):
+            return None
+        states = [self.mirror.state(names[label]) for label in self.object_labels]
+        if any(s is None for s in states):
+            return None
+        return min(datetime.fromisoformat(s["synced_at"]) for s in states)
+
+    def sitetracker_frame(self):
+        """
+        The report's Sitetracker input as a DataFrame, read from the mirror.
+        """
+        names = self._api_names
+        columns = [
+            (names[r["Object Name"]], r["API Name"], r["Sitetracker Field Name"])
+            for _, r in self.mapping_df.iterrows()
+        ]
+        return self.mirror.sitetracker_frame(names[self.main_label], columns, self._lookups())
+
+    def write_sitetracker_csv(self, path):
+        df = self.sitetracker_frame()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        df.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+        return len(df)
+
+
+def main():
+    from engine.config_loader import YamlConfigLoader
+    from engine.mapping_loader import MappingLoader
+
+    parser = argparse.ArgumentParser(
+        prog="python -m salesforce.mirror",
+        description="Sync the local mirror of a report's Salesforce objects"
+    )
+    parser.add_argument("--report", required=True, help="Report name")
+    parser.add_argument("--full", action="store_true", help="Reload every object from scratch")
+    args = parser.parse_args()
+
+    cfg = YamlConfigLoader.load(args.report)
+    base_dir = os.path.join(os.getcwd(), cfg["folders"]["work_dir"])
+    mapping = MappingLoader(
+        os.path.join(os.path.dirname(base_dir), "Common", "Mapping_file.xlsx"), args.report
+    )
+
+    report_mirror = ReportMirror(mapping.load(), cfg.get("mirror"), base_dir)
+    for result in report_mirror.sync(full=args.full):
+        print(
+            f"[MIRROR] {result['sobject']}: {result['mode']}, {result['upserted']} upserted, "
+            f"{result['deleted']} deleted, {result['rows']} rows (watermark {result['watermark']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
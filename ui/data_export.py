@@ -2,13 +2,18 @@ import streamlit as st
 import os
 import threading
 import webbrowser
+from datetime import datetime
 
 from auth.oauth_server import start_oauth_server
 from auth.token_store import load_token, clear_token
 
+from engine.progress import ProgressReporter
+from salesforce.bulk_export import BulkExporter
 from salesforce.userinfo import get_user_info
 from salesforce.metadata import list_objects
 
+EXPORT_DIR = "exports"
+
 
 def render(go_home):
     st.subheader("📤 Data Export")
@@ -112,15 +117,70 @@ def render(go_home):
     st.success("✅ Salesforce connected")
     st.code(f"Instance: {token.get('instance_url')}")
 
-    col1, col2 = st.columns(2)
+    # ==================================================
+    # EXPORT
+    # ==================================================
+    st.subheader("⬇️ Export Data")
+
+    selected = st.multiselect(
+        "Objects to export",
+        [obj["name"] for obj in objects],
+        key="export_objects"
+    )
 
+    col1, col2, col3 = st.columns(3)
     with col1:
-        if st.button("⬇️ Export Data", key="export_data"):
-            st.info("Export logic will go here")
-
+        output_format = st.radio("Format", ["parquet", "csv"], horizontal=True, key="export_format")
     with col2:
-        if st.button("⬆️ Run Data Loader", key="export_loader"):
-            st.info("Reuse existing engine here")
+        concurrency = st.number_input(
+            "Concurrent queries", min_value=1, max_value=16, value=4, key="export_concurrency"
+        )
+    with col3:
+        chunk_size = st.number_input(
+            "Records per chunk", min_value=1_000, max_value=1_000_000, value=100_000,
+            step=10_000, key="export_chunk_size"
+        )
+
+    if st.button("⬇️ Export Data", key="export_data", disabled=not selected):
+        out_dir = os.path.join(
+            EXPORT_DIR, datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        )
+        bars = {name: st.progress(0.0, text=name) for name in selected}
+
+        def on_progress(event):
+            total = event["total"] or 0
+            done = min(1.0, (event["rows"] or 0) / total) if total else 1.0
+            bars[event["stage"]].progress(
+                done, text=f"{event['stage']}: {event['rows'] or 0:,} / {total:,} records"
+            )
+
+        try:
+            manifest = BulkExporter(
+                concurrency=int(concurrency),
+                chunk_size=int(chunk_size),
+                output_format=output_format,
+                progress=ProgressReporter(on_progress)
+            ).export(selected, out_dir)
+        except Exception as e:
+            st.error(f"Export failed: {e}")
+        else:
+            st.success(f"Exported to {out_dir}")
+            st.dataframe(
+                [
+                    {
+                        "Object": name,
+                        "File": info["file"],
+                        "Records": info["rows"],
+                        "Chunks": len(info["chunks"]),
+                        "Seconds": info["seconds"]
+                    }
+                    for name, info in manifest["objects"].items()
+                ],
+                use_container_width=True
+            )
+
+    if st.button("⬆️ Run Data Loader", key="export_loader"):
+        st.info("Reuse existing engine here")
 
     st.divider()
 
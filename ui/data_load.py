@@ -4,6 +4,41 @@ import subprocess
 import os
 import sys
 import re
+import json
+import tempfile
+from datetime import date
+
+from engine.output_pager import OutputPager
+from engine.progress import PROGRESS_PREFIX
+from engine.run_history import RunHistory
+from engine.snapshot import SNAPSHOT_DIR_NAME, SnapshotStore
+
+@st.cache_resource(max_entries=8)
+def _open_pager(csv_path, mtime):
+    # mtime in the key: a rewritten output gets a fresh snapshot
+    return OutputPager(csv_path)
+
+
+def _output_pager(csv_path):
+    return _open_pager(csv_path, os.path.getmtime(csv_path))
+
+
+def _progress_state(event):
+    """
+    (fraction, label) for st.progress from an engine progress event.
+    """
+    rows, total = event["rows"], event["total"]
+    fraction = min(1.0, rows / total) if rows and total else 0.0
+    if event["event"] == "stage_finished":
+        fraction = 1.0
+
+    label = f"{event['stage']}"
+    if total:
+        label += f": {rows or 0:,} / {total:,} rows"
+    if event["rows_per_second"]:
+        label += f" ({event['rows_per_second']:,.0f} rows/s)"
+    return fraction, label
+
 
 # ======================
 # CONFIG
@@ -87,6 +122,34 @@ def render(go):
         st.info("Please select a report to continue.")
         st.stop()
 
+    # ======================
+    # RUN HISTORY
+    # ======================
+
+    with st.expander("📜 Run History"):
+        history = RunHistory(RunHistory.default_path(BASE_DIR))
+        month_start = date.today().replace(day=1).isoformat()
+        totals = history.totals(selected_report, since=month_start)
+
+        h1, h2, h3 = st.columns(3)
+        h1.metric("Runs this month", totals["runs"])
+        h2.metric("Delta records this month", totals["delta_records"])
+        h3.metric("Fields updated this month", totals["fields_updated"])
+
+        past_runs = history.runs(selected_report, limit=50)
+
+        if not past_runs:
+            st.info("No runs recorded for this report yet.")
+        else:
+            st.dataframe(
+                pd.DataFrame(past_runs)[[
+                    "started_at", "status", "valid_records", "delta_records",
+                    "fields_updated", "duplicate_keys", "invalid_dates",
+                    "duration_seconds", "run_dir", "error"
+                ]],
+                use_container_width=True
+            )
+
     # ======================
     # LOAD MAPPING (REPORT-SPECIFIC)
     # ======================
@@ -99,6 +162,36 @@ def render(go):
         st.warning("No mapping found for this report.")
         st.stop()
 
+    # ======================
+    # SITETRACKER LOOKUP
+    # ======================
+
+    with st.expander("🛰 Sitetracker Lookup"):
+        st_dir = os.path.join(REPORTS[selected_report]["work_dir"], "input", "sitetracker")
+        st_inputs = sorted(
+            f for f in os.listdir(st_dir) if not f.startswith(".")
+        ) if os.path.isdir(st_dir) else []
+
+        pk_rows = mapping_df[mapping_df["Primary Key?"].astype(str).str.upper() == "YES"]
+
+        if not st_inputs:
+            st.info("No Sitetracker file in the input folder.")
+        elif pk_rows.empty:
+            st.info("No primary key defined in the mapping.")
+        else:
+            st_file = st.selectbox("Sitetracker file", st_inputs)
+            pk_st = pk_rows.iloc[0]["Sitetracker Field Name"]
+            lookup_refs = st.text_input(f"{pk_st} (comma separated)")
+
+            if lookup_refs.strip():
+                # Memory-mapped snapshot, shared with the engine's runs and previews
+                store = SnapshotStore(
+                    os.path.join(REPORTS[selected_report]["work_dir"], SNAPSHOT_DIR_NAME)
+                )
+                sha = store.ensure(os.path.join(st_dir, st_file))
+                refs = [r.strip() for r in lookup_refs.split(",") if r.strip()]
+                st.dataframe(store.lookup(sha, pk_st, refs), use_container_width=True)
+
     # ======================
     # OBJECT SELECTION
     # ======================
@@ -141,6 +234,62 @@ def render(go):
     else:
         st.dataframe(preview_df, use_container_width=True)
 
+    col1, col2 = st.columns([1, 1])
+
+    with col1:
+        sample_method = st.radio(
+            "Sample",
+            ["head", "reservoir"],
+            horizontal=True,
+            help="head: first rows (fastest) · reservoir: random rows across the file"
+        )
+
+    with col2:
+        sample_rows = st.number_input("Sample rows", min_value=50, max_value=20000, value=500, step=50)
+
+    if st.button("🔎 Estimate Changes"):
+        with st.spinner("Sampling input files…"):
+            result = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "engine.cli",
+                    "--report",
+                    selected_report,
+                    "--preview",
+                    "--sample-rows",
+                    str(sample_rows),
+                    "--sample-method",
+                    sample_method
+                ],
+                cwd=BASE_DIR,
+                capture_output=True,
+                text=True
+            )
+
+        stdout = result.stdout.strip()
+
+        if result.returncode != 0:
+            st.error("❌ Preview failed.")
+            st.code(result.stderr.strip() or stdout, language="text")
+        elif "skip" in stdout.lower():
+            st.warning("⚠️ Preview skipped (input files missing).")
+        else:
+            estimate = json.loads(stdout)
+
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Sampled rows", f"{estimate['sampled_rows']} / {estimate['total_source_rows']}")
+            m2.metric("Estimated delta records", estimate["estimated_delta_records"])
+            m3.metric("Estimated fields updated", estimate["estimated_fields_updated"])
+
+            st.dataframe(
+                [
+                    {"API Name": api, "Sample changes": c["sample"], "Estimated changes": c["estimated"]}
+                    for api, c in estimate["field_changes"].items()
+                ],
+                use_container_width=True
+            )
+
     # ======================
     # CONFIRMATION
     # ======================
@@ -162,23 +311,42 @@ def render(go):
             st.error("You must confirm the mapping before running.")
             st.stop()
 
-        st.info("Running engine… please wait")
-
-        result = subprocess.run(
-            [
-                sys.executable,
-                "-m",
-                "engine.cli",
-                "--report",
-                selected_report
-            ],
-            cwd=BASE_DIR,
-            capture_output=True,
-            text=True
-        )
-
-        stdout = result.stdout.strip()
-        stderr = result.stderr.strip()
+        progress_bar = st.progress(0.0, text="Starting engine…")
+
+        # stderr goes to a temp file so a chatty engine can never block on a full pipe
+        with tempfile.TemporaryFile(mode="w+", encoding="utf-8") as err_file:
+            process = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "engine.cli",
+                    "--report",
+                    selected_report,
+                    "--progress",
+                    "json"
+                ],
+                cwd=BASE_DIR,
+                stdout=subprocess.PIPE,
+                stderr=err_file,
+                text=True
+            )
+
+            output_lines = []
+            for line in process.stdout:
+                if line.startswith(PROGRESS_PREFIX):
+                    event = json.loads(line[len(PROGRESS_PREFIX):])
+                    progress_bar.progress(*_progress_state(event))
+                else:
+                    output_lines.append(line.rstrip("\n"))
+
+            returncode = process.wait()
+            err_file.seek(0)
+            stderr_text = err_file.read()
+
+        progress_bar.empty()
+
+        stdout = "\n".join(output_lines).strip()
+        stderr = stderr_text.strip()
 
         st.subheader("🖥 Engine Output")
         st.code(stdout if stdout else "No output", language="text")
@@ -187,7 +355,7 @@ def render(go):
             st.subheader("⚠️ Engine Errors")
             st.code(stderr, language="text")
 
-        if result.returncode != 0:
+        if returncode != 0:
             st.error("❌ Engine execution failed.")
             st.stop()
 
@@ -208,6 +376,7 @@ def render(go):
             st.stop()
 
         run_path = match.group(1).strip()
+        st.session_state["last_run_path"] = run_path
         summary_path = os.path.join(run_path, "run_summary.txt")
 
         st.subheader("📊 Run Summary")
@@ -221,6 +390,63 @@ def render(go):
         st.subheader("📂 Output Location")
         st.code(run_path)
 
+    # ======================
+    # RESULTS VIEWER
+    # ======================
+
+    st.subheader("📑 Results Viewer")
+
+    run_dirs = []
+    if st.session_state.get("last_run_path"):
+        run_dirs.append(st.session_state["last_run_path"])
+    for r in history.runs(selected_report, limit=50):
+        if r["status"] in ("success", "noop") and r["run_dir"] and r["run_dir"] not in run_dirs:
+            run_dirs.append(r["run_dir"])
+    run_dirs = [d for d in run_dirs if os.path.isdir(d)]
+
+    if not run_dirs:
+        st.info("No run outputs available yet.")
+    else:
+        view_run = st.selectbox("Run", run_dirs)
+        output_files = sorted(f for f in os.listdir(view_run) if f.lower().endswith(".csv"))
+
+        if not output_files:
+            st.info("This run has no CSV outputs.")
+        else:
+            view_file = st.selectbox("Output file", output_files)
+            pager = _output_pager(os.path.join(view_run, view_file))
+
+            v1, v2, v3 = st.columns([1, 2, 1])
+            with v1:
+                filter_column = st.selectbox("Filter column", ["-- None --"] + pager.columns)
+            with v2:
+                filter_value = st.text_input("Filter value", help="e.g. a project reference or API field")
+            with v3:
+                contains = st.checkbox("Contains", value=True)
+
+            filters = {}
+            if filter_column != "-- None --" and filter_value.strip():
+                filters[filter_column] = filter_value.strip()
+
+            p1, p2 = st.columns([1, 1])
+            with p2:
+                page_size = st.selectbox("Rows per page", [50, 100, 500, 1000], index=1)
+
+            matching = pager.filtered(filters, contains).num_rows
+            page_count = max(1, -(-matching // page_size))
+
+            with p1:
+                page_no = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+
+            page_df, matching = pager.page(int(page_no) - 1, page_size, filters, contains)
+            st.dataframe(page_df, use_container_width=True)
+
+            first_row = (int(page_no) - 1) * page_size
+            st.caption(
+                f"Rows {first_row + 1 if matching else 0}–{first_row + len(page_df)} "
+                f"of {matching} (total {pager.num_rows})"
+            )
+
     # ======================
     # FOOTER
     # ======================